@@ -0,0 +1,97 @@
+"""unique normalized title
+
+Revision ID: 2e6c9a4f1d85
+Revises: d4a8e17c5b90
+Create Date: 2026-10-18 15:02:19.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e6c9a4f1d85'
+down_revision: Union[str, None] = 'd4a8e17c5b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+
+    # Merge papers sharing a normalized title into one row, preferring a
+    # row with an embedding, and move their citation edges over to it.
+    # Titles normalizing to '' (non-Latin or punctuation only) are
+    # unrelated papers and stay apart
+    op.execute("""
+        CREATE TEMPORARY TABLE paper_merge ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY normalized_title
+                ORDER BY embedding IS NULL, id
+            ) AS keep_id
+            FROM paper
+            WHERE normalized_title <> ''
+        ) ranked
+        WHERE id <> keep_id;
+    """)
+    op.execute("""
+        INSERT INTO "references" (paper_id, referencing_paper_id)
+        SELECT DISTINCT
+            COALESCE(src.keep_id, r.paper_id),
+            COALESCE(dst.keep_id, r.referencing_paper_id)
+        FROM "references" r
+        LEFT JOIN paper_merge src ON src.id = r.paper_id
+        LEFT JOIN paper_merge dst ON dst.id = r.referencing_paper_id
+        WHERE (src.id IS NOT NULL OR dst.id IS NOT NULL)
+          AND COALESCE(src.keep_id, r.paper_id)
+              <> COALESCE(dst.keep_id, r.referencing_paper_id)
+        ON CONFLICT DO NOTHING;
+    """)
+    op.execute("""
+        DELETE FROM "references" r
+        USING paper_merge m
+        WHERE r.paper_id = m.id OR r.referencing_paper_id = m.id;
+    """)
+    op.execute("""
+        DELETE FROM paper p
+        USING paper_merge m
+        WHERE p.id = m.id;
+    """)
+    op.create_index(
+        'uq_paper_normalized_title',
+        'paper',
+        ['normalized_title'],
+        unique=True,
+        postgresql_where=sa.text("normalized_title <> ''"),
+    )
+
+    # Trigram index for optional fuzzy reference matching
+    conn = op.get_bind()
+    has_trgm = conn.scalar(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+    if has_trgm:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_paper_normalized_title_trgm',
+                'paper',
+                ['normalized_title'],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={'normalized_title': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_paper_normalized_title_trgm',
+        table_name='paper',
+        if_exists=True,
+    )
+    op.drop_index('uq_paper_normalized_title', table_name='paper')
@@ -0,0 +1,70 @@
+"""add paper filter columns
+
+Revision ID: 4b7e2d9c1a63
+Revises: c58e0b7a13d4
+Create Date: 2026-10-19 10:41:07.318552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2d9c1a63'
+down_revision: Union[str, None] = 'c58e0b7a13d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    # Filled from MongoDB by app.scripts.backfill_paper_filters
+    op.add_column('paper', sa.Column('published_year', sa.Integer(), nullable=True))
+    op.add_column('paper', sa.Column('impact', sa.Integer(), nullable=True))
+    op.add_column('paper', sa.Column('authors', postgresql.ARRAY(sa.String()), nullable=True))
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_paper_published_year',
+            'paper',
+            ['published_year'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_paper_impact',
+            'paper',
+            ['impact'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_paper_authors',
+            'paper',
+            ['authors'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in ('ix_paper_authors', 'ix_paper_impact', 'ix_paper_published_year'):
+            op.drop_index(
+                name,
+                table_name='paper',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    op.drop_column('paper', 'authors')
+    op.drop_column('paper', 'impact')
+    op.drop_column('paper', 'published_year')
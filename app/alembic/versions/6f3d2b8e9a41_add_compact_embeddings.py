@@ -0,0 +1,84 @@
+"""add compact embeddings
+
+Revision ID: 6f3d2b8e9a41
+Revises: 80673648e183
+Create Date: 2026-10-18 20:41:07.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f3d2b8e9a41'
+down_revision: Union[str, None] = '80673648e183'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COMPACT_INDEXES = {
+    'ix_paper_embedding_half': ('embedding_half', 'halfvec_cosine_ops'),
+    'ix_paper_embedding_bit': ('embedding_bit', 'bit_hamming_ops'),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    # halfvec and binary_quantize need pgvector 0.7 or later
+    op.execute("ALTER EXTENSION vector UPDATE;")
+
+    # Adding stored generated columns rewrites the table, which backfills
+    # them from the existing embeddings
+    op.add_column('paper', sa.Column(
+        'embedding_half',
+        pgvector.sqlalchemy.HALFVEC(768),
+        sa.Computed('embedding::halfvec(768)', persisted=True),
+        nullable=True,
+    ))
+    op.add_column('paper', sa.Column(
+        'embedding_bit',
+        pgvector.sqlalchemy.BIT(768),
+        sa.Computed('binary_quantize(embedding)::bit(768)', persisted=True),
+        nullable=True,
+    ))
+
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        params = {'lists': settings.IVFFLAT_LISTS}
+    else:
+        params = {
+            'm': settings.HNSW_M,
+            'ef_construction': settings.HNSW_EF_CONSTRUCTION,
+        }
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, (column, ops) in COMPACT_INDEXES.items():
+            op.create_index(
+                name,
+                'paper',
+                [column],
+                unique=False,
+                postgresql_using=settings.VECTOR_INDEX_TYPE,
+                postgresql_with=params,
+                postgresql_ops={column: ops},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in COMPACT_INDEXES:
+            op.drop_index(
+                name,
+                table_name='paper',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    op.drop_column('paper', 'embedding_bit')
+    op.drop_column('paper', 'embedding_half')
@@ -0,0 +1,47 @@
+"""add paper centrality columns
+
+Revision ID: 7d2c5e8f4a19
+Revises: e91d3f6a2b47
+Create Date: 2026-10-19 17:08:52.913274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c5e8f4a19'
+down_revision: Union[str, None] = 'e91d3f6a2b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by app.scripts.pagerank
+    op.add_column('paper', sa.Column('pagerank', sa.Float(), nullable=True))
+    op.add_column('paper', sa.Column('in_degree', sa.Integer(), nullable=True))
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_paper_pagerank',
+            'paper',
+            ['pagerank'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_paper_pagerank',
+            table_name='paper',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('paper', 'in_degree')
+    op.drop_column('paper', 'pagerank')
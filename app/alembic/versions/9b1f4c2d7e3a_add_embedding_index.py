@@ -0,0 +1,58 @@
+"""add embedding index
+
+Revision ID: 9b1f4c2d7e3a
+Revises: 5835f0bcf6ca
+Create Date: 2026-10-18 10:12:41.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1f4c2d7e3a'
+down_revision: Union[str, None] = '5835f0bcf6ca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        # IVFFlat picks its centroids from the rows present at build time,
+        # so build it after the corpus has been loaded.
+        params = {'lists': settings.IVFFLAT_LISTS}
+    else:
+        params = {
+            'm': settings.HNSW_M,
+            'ef_construction': settings.HNSW_EF_CONSTRUCTION,
+        }
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_paper_embedding',
+            'paper',
+            ['embedding'],
+            unique=False,
+            postgresql_using=settings.VECTOR_INDEX_TYPE,
+            postgresql_with=params,
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_paper_embedding',
+            table_name='paper',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
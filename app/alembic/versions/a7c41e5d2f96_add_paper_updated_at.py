@@ -0,0 +1,52 @@
+"""add paper updated_at
+
+Revision ID: a7c41e5d2f96
+Revises: 6f3d2b8e9a41
+Create Date: 2026-10-18 22:05:33.140862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c41e5d2f96'
+down_revision: Union[str, None] = '6f3d2b8e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    # A non-volatile default fills existing rows without a table rewrite
+    op.add_column('paper', sa.Column(
+        'updated_at',
+        sa.DateTime(timezone=True),
+        server_default=sa.text('now()'),
+        nullable=False,
+    ))
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_paper_updated_at',
+            'paper',
+            ['updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_paper_updated_at',
+            table_name='paper',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('paper', 'updated_at')
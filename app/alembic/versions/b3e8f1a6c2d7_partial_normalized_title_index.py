@@ -0,0 +1,54 @@
+"""partial normalized title index
+
+Revision ID: b3e8f1a6c2d7
+Revises: 7d2c5e8f4a19
+Create Date: 2026-10-20 09:41:27.518362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1a6c2d7'
+down_revision: Union[str, None] = '7d2c5e8f4a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_index(where: str | None) -> None:
+    # Build the new index before dropping the old one so upserts always
+    # find a unique index to conflict on
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_paper_normalized_title_new',
+            'paper',
+            ['normalized_title'],
+            unique=True,
+            postgresql_where=sa.text(where) if where else None,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'uq_paper_normalized_title',
+            table_name='paper',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.execute(
+            "ALTER INDEX uq_paper_normalized_title_new "
+            "RENAME TO uq_paper_normalized_title")
+
+
+def upgrade() -> None:
+    # Titles normalizing to '' are unrelated papers and must not share a
+    # key; databases migrated before 2e6c9a4f1d85 excluded them need the
+    # index rebuilt
+    _replace_index("normalized_title <> ''")
+
+
+def downgrade() -> None:
+    # Fails if several papers have titles normalizing to ''
+    _replace_index(None)
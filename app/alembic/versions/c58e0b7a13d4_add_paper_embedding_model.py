@@ -0,0 +1,51 @@
+"""add paper embedding_model
+
+Revision ID: c58e0b7a13d4
+Revises: a7c41e5d2f96
+Create Date: 2026-10-18 23:12:48.906215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e0b7a13d4'
+down_revision: Union[str, None] = 'a7c41e5d2f96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    op.add_column('paper', sa.Column('embedding_model', sa.String(), nullable=True))
+    # Every embedding so far was computed by SPECTER2
+    op.execute(
+        "UPDATE paper SET embedding_model = 'allenai/specter2' "
+        "WHERE embedding IS NOT NULL"
+    )
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_paper_embedding_model',
+            'paper',
+            ['embedding_model'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_paper_embedding_model',
+            table_name='paper',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column('paper', 'embedding_model')
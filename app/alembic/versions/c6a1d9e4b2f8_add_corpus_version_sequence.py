@@ -0,0 +1,29 @@
+"""add corpus version sequence
+
+Revision ID: c6a1d9e4b2f8
+Revises: b3e8f1a6c2d7
+Create Date: 2026-10-20 10:26:03.184527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1d9e4b2f8'
+down_revision: Union[str, None] = 'b3e8f1a6c2d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bumped after writes from any process; keys cached search responses
+    op.execute(sa.schema.CreateSequence(
+        sa.Sequence('corpus_version'), if_not_exists=True))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(
+        sa.Sequence('corpus_version'), if_exists=True))
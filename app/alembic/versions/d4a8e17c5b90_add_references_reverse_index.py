@@ -0,0 +1,42 @@
+"""add references reverse index
+
+Revision ID: d4a8e17c5b90
+Revises: 9b1f4c2d7e3a
+Create Date: 2026-10-18 13:40:05.218364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8e17c5b90'
+down_revision: Union[str, None] = '9b1f4c2d7e3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_references_referencing_paper_id',
+            'references',
+            ['referencing_paper_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_references_referencing_paper_id',
+            table_name='references',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,41 @@
+"""add upload status notify trigger
+
+Revision ID: d8f2b7c3e5a1
+Revises: c6a1d9e4b2f8
+Create Date: 2026-10-20 11:12:45.902138
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2b7c3e5a1'
+down_revision: Union[str, None] = 'c6a1d9e4b2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every created or updated status is sent on the upload_status
+    # channel, whichever statement or process wrote it
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_upload_status() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('upload_status', row_to_json(NEW)::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER upload_status_notify
+        AFTER INSERT OR UPDATE ON upload_status
+        FOR EACH ROW EXECUTE FUNCTION notify_upload_status();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS upload_status_notify ON upload_status;")
+    op.execute("DROP FUNCTION IF EXISTS notify_upload_status();")
@@ -0,0 +1,63 @@
+"""add upload_status indexes
+
+Revision ID: e91d3f6a2b47
+Revises: 4b7e2d9c1a63
+Create Date: 2026-10-19 14:22:35.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91d3f6a2b47'
+down_revision: Union[str, None] = '4b7e2d9c1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STAGES = ('pdf_upload', 'document_layout', 'reading_order', 'db_loaded')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_upload_status_filename',
+            'upload_status',
+            ['filename', 'request_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for stage in STAGES:
+            op.create_index(
+                f'ix_upload_status_pending_{stage}',
+                'upload_status',
+                ['request_id'],
+                unique=False,
+                postgresql_where=sa.text(f'NOT {stage}'),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for stage in STAGES:
+            op.drop_index(
+                f'ix_upload_status_pending_{stage}',
+                table_name='upload_status',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+        op.drop_index(
+            'ix_upload_status_filename',
+            table_name='upload_status',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
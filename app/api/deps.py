@@ -4,12 +4,13 @@ from fastapi import Depends
 from pymongo.collection import Collection
 from sqlalchemy.orm import Session
 
-from app.core.database import engine, collection
+from app.core.database import engine, collection, content_collection
 
 
 def get_db() -> Generator[Session, None, None]:
     """
-    PostgreSQL session.
+    PostgreSQL session. A pool connection is only checked out on first 
+    use, so routes compute embeddings before touching the session.
     """
     with Session(engine) as session:
         yield session
@@ -22,5 +23,14 @@ def get_collection() -> Generator[Collection, None, None]:
     return collection
 
 
+def get_content_collection() -> Collection | None:
+    """
+    MongoDB collection for paper contents, if stored separately.
+    """
+    return content_collection
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
 CollectionDep = Annotated[Collection, Depends(get_collection)]
+ContentCollectionDep = Annotated[
+    Collection | None, Depends(get_content_collection)]
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.routes import search
+from app.api.routes import system
 from app.api.routes import upload
 
 
@@ -16,3 +17,8 @@ api_router.include_router(
     prefix="/upload",
     tags=["Upload Papers"]
 )
+api_router.include_router(
+    router=system.router,
+    prefix="/system",
+    tags=["System"]
+)
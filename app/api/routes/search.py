@@ -1,21 +1,63 @@
-import torch
-from fastapi import APIRouter
+import uuid
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pymongo.collection import Collection
+from sqlalchemy.orm import Session
 
 import app.utils as utils
 from app.api.deps import CollectionDep, SessionDep
+from app.core.config import settings
+from app.core.executor import run_inference
 from app.crud.metadata import *
 from app.crud.paper import *
 from app.models.schemas import (
     PaperQuery,
     PaperQueryResponse,
     PaperGraphRequest,
-    PaperGraphResponse
+    PaperGraphResponse,
+    PaperPathResponse,
+    PaperRelatedResponse,
+    PaperText,
 )
 
 
 router = APIRouter()
 
 
+def canonical_request(query: PaperQuery) -> dict:
+    """
+    Fields of a query that determine its response, with the texts in the 
+    canonical form that query embeddings are cached by.
+    """
+    return query.model_dump(
+        mode="json", exclude=set(PaperText.model_fields), exclude_none=True
+    ) | utils.canonicalize_query(query.texts())
+
+
+def centrality_weight(query: PaperQuery) -> float:
+    if query.centrality_weight is None:
+        return settings.CENTRALITY_WEIGHT
+    return query.centrality_weight
+
+
+def fetch_summaries(
+    collection: Collection, session: Session, ids: list[uuid.UUID]
+) -> dict[uuid.UUID, dict]:
+    """
+    Metadata summaries of papers by id; placeholder papers of unknown 
+    references, which have no metadata, only get their title.
+    """
+    metadata = get_metadata_summary_dicts_by_ids(collection, ids)
+    missing = [id for id in ids if id not in metadata]
+    if missing:
+        metadata |= {
+            paper.id: {'title': paper.title}
+        for paper in get_papers_by_ids(session, missing)}
+    return metadata
+
+
 @router.post(
     path="/query",
     summary="Search top 5 papers based on query text", 
@@ -26,19 +68,37 @@ async def search_papers_by_query(
     collection: CollectionDep,
     session: SessionDep
 ):
+    # Identical queries share a response until the corpus changes
+    cache = utils.response_cache
+    key = await run_in_threadpool(cache.key, "query", canonical_request(body))
+    cached = await run_in_threadpool(cache.get, key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
+    # Embed the query before the session checks out a connection
+    query_emb = await run_inference(
+        utils.create_query_embedding, body.texts())
+
     # Retrieve papers based on cosine similarity
-    papers: list[Paper] = get_papers_by_similarity(
+    result = await run_in_threadpool(
+        search_paper_ids,
         session=session,
-        query=body.model_dump(),
-        num_retrieval=5
+        query_emb=query_emb,
+        num_retrieval=5,
+        ef_search=body.ef_search,
+        probes=body.probes,
+        filters=body.filters,
+        centrality_weight=centrality_weight(body),
     )
 
     # Fetch metadata of selected papers
-    metadata = [
-        get_metadata_by_id(collection, p.id).model_dump() | {'id': p.id} 
-    for p in papers]
+    metadata = await run_in_threadpool(
+        get_metadata_summary_dicts_by_ids, collection, [id for id, _ in result])
     
-    return [PaperQueryResponse(**d) for d in metadata]
+    # Rendered directly, since the documents were validated on upload
+    response = ORJSONResponse([{'id': id} | m for id, m in metadata.items()])
+    await run_in_threadpool(cache.set, key, response.body)
+    return response
 
 
 @router.post(
@@ -51,30 +111,134 @@ async def search_subgraph(
     collection: CollectionDep,
     session: SessionDep
 ):
-    # Retrieve a list of adjacent nodes
-    ref_papers: list[Paper] = get_references_by_id(
+    # Identical requests share a response until the corpus changes
+    cache = utils.response_cache
+    request = body.model_dump(mode="json", exclude={"query"}, exclude_none=True)
+    request["query"] = canonical_request(body.query)
+    key = await run_in_threadpool(cache.key, "graph", request)
+    cached = await run_in_threadpool(cache.get, key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
+    # Embed the query before the session checks out a connection
+    query_emb = await run_inference(
+        utils.create_query_embedding, body.query.texts())
+
+    if body.depth == 1:
+        # Retrieve the adjacent nodes most similar to the query
+        scores: list[tuple[uuid.UUID, float]] = await run_in_threadpool(
+            get_similar_references,
+            session=session,
+            paper_id=body.root_id,
+            query_emb=query_emb,
+            num_retrieval=body.num_nodes,
+            centrality_weight=centrality_weight(body.query),
+        )
+        nodes = [(id, body.root_id, 1, score) for id, score in scores]
+    else:
+        # Expand several hops, pruning each level to the best matches
+        nodes = await run_in_threadpool(
+            expand_references,
+            session=session,
+            paper_id=body.root_id,
+            query_emb=query_emb,
+            depth=body.depth,
+            beam_width=body.beam_width or body.num_nodes,
+            num_nodes=body.num_nodes,
+            centrality_weight=centrality_weight(body.query),
+        )
+
+    # Fetch metadata of selected papers
+    metadata = await run_in_threadpool(
+        get_metadata_summary_dicts_by_ids, collection, [n[0] for n in nodes])
+
+    # Rendered directly, since the documents were validated on upload
+    response = ORJSONResponse([
+        {'id': id} | metadata[id] | {
+            'parent_id': parent_id, 'depth': depth, 'score': score}
+    for id, parent_id, depth, score in nodes if id in metadata])
+    await run_in_threadpool(cache.set, key, response.body)
+    return response
+
+
+@router.get(
+    path="/path",
+    summary="Find a shortest citation path between two papers",
+    response_model=list[PaperPathResponse]
+)
+async def search_citation_path(
+    source: uuid.UUID,
+    target: uuid.UUID,
+    collection: CollectionDep,
+    session: SessionDep,
+    max_hops: int = Query(default=6, ge=1, le=12),
+    directed: bool = False,
+):
+    # Citations are followed either way unless `directed`, where each 
+    # paper on the path cites the next one
+    graph = await run_in_threadpool(utils.get_citation_graph)
+    path = await run_in_threadpool(
+        graph.shortest_path, source, target, max_hops, directed)
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No citation path within {max_hops} hops")
+
+    # Fetch metadata of papers on the path
+    metadata = await run_in_threadpool(
+        fetch_summaries, collection, session, path)
+
+    return ORJSONResponse([
+        {'id': id} | metadata.get(id, {'title': None}) | {
+            'cites_next': graph.cites(id, next_id) if next_id else None}
+    for id, next_id in zip(path, path[1:] + [None])])
+
+
+@router.post(
+    path="/related",
+    summary="Rank papers around the hits of a query by personalized PageRank",
+    response_model=list[PaperRelatedResponse]
+)
+async def search_related_papers(
+    body: PaperQuery,
+    collection: CollectionDep,
+    session: SessionDep,
+    num_results: int = Query(default=10, ge=1, le=100),
+):
+    # Identical queries share a response until the corpus changes
+    cache = utils.response_cache
+    request = canonical_request(body) | {"num_results": num_results}
+    key = await run_in_threadpool(cache.key, "related", request)
+    cached = await run_in_threadpool(cache.get, key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
+    # Embed the query before the session checks out a connection
+    query_emb = await run_inference(
+        utils.create_query_embedding, body.texts())
+
+    # The hits of the query seed the walks, weighted by their scores
+    hits = await run_in_threadpool(
+        search_paper_ids,
         session=session,
-        paper_id=body.root_id,
+        query_emb=query_emb,
+        num_retrieval=5,
+        ef_search=body.ef_search,
+        probes=body.probes,
+        filters=body.filters,
+        centrality_weight=centrality_weight(body),
     )
-    
-    # Sort by cosine similarity with query embedding
-    query_emb = utils.create_query_embedding(body.query.model_dump())
-    scores = [
-        {
-            "id": p.id,
-            "score": utils.cosine_similarity(
-                query_emb,
-                torch.from_numpy(p.embedding)
-            )
-        }
-        for p in ref_papers
-    ]
-    scores.sort(reverse=True, key=lambda x: x["score"])
-    scores[:body.num_nodes]
+    graph = await run_in_threadpool(utils.get_citation_graph)
+    ranked = await run_in_threadpool(
+        graph.personalized_pagerank,
+        {id: max(score, 1e-6) for id, score in hits}, num_results)
 
-    # Fetch metadata of selected papers
-    result = [
-        get_metadata_by_id(collection, p['id']).model_dump() | p
-    for p in scores]
+    # Fetch metadata of ranked papers
+    metadata = await run_in_threadpool(
+        fetch_summaries, collection, session, [id for id, _ in ranked])
 
-    return [PaperGraphResponse(**d) for d in result]
+    response = ORJSONResponse([
+        {'id': id} | metadata[id] | {'score': score}
+    for id, score in ranked if id in metadata])
+    await run_in_threadpool(cache.set, key, response.body)
+    return response
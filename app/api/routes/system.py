@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+
+import app.utils as utils
+from app.core.batching import BatchingEmbedding
+
+
+router = APIRouter()
+
+
+@router.get(
+    path="/embedding",
+    summary="Get embedding model memory and micro-batching statistics"
+)
+def get_embedding_stats():
+    model = utils.get_embedding_model()
+    stats = {"model": model.name, "parameter_bytes": model.parameter_bytes()}
+    if not isinstance(model, BatchingEmbedding):
+        return stats | {"batching": False}
+    return stats | {"batching": True} | model.stats()
+
+
+@router.get(
+    path="/cache",
+    summary="Get query embedding and search response cache statistics"
+)
+def get_cache_stats():
+    return {
+        "query_embedding": utils.query_embedding_cache.stats(),
+        "response": utils.response_cache.stats(),
+    }
@@ -1,11 +1,21 @@
-from fastapi import APIRouter
+import json
 
-from app.api.deps import CollectionDep, SessionDep
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.api.deps import CollectionDep, ContentCollectionDep, SessionDep
+from app.core.config import settings
+from app.core.database import engine
+from app.core.executor import run_inference
+from app.crud.job import *
 from app.crud.paper import *
 from app.crud.metadata import *
 from app.crud.status import *
+from app.ingest import ingest_papers
 from app.models.metadata import Metadata
-from app.models.paper import Paper
 from app.models.schemas import *
 from app.models.status import UploadStatus
 
@@ -21,52 +31,139 @@ router = APIRouter()
 async def upload_paper(
     body: Metadata,
     collection: CollectionDep,
+    content_collection: ContentCollectionDep,
     session: SessionDep,
 ):
-    data = Metadata.model_validate(body)
-    
-    # Create paper
-    paper: Paper = get_paper_by_title(session, data.title)
-    if not Paper:
-        paper = create_paper(
-            session=session,
-            texts={'title': data.title, 'abstract': data.abstract},
-        )
-    else:
-        paper = update_paper(
-            session=session,
-            texts={'title': data.title, 'abstract': data.abstract},
-        )
-
-    # Create metadata
-    create_metadata(
-        collection=collection,
-        id=paper.id,
-        data=data
-    )
+    texts = {'title': body.title, 'abstract': body.abstract}
+
+    # Embed the paper before the session checks out a connection
+    embedding = await run_inference(utils.create_embedding, texts)
+
+    embeddings = embedding.unsqueeze(0)
+    ids = await run_in_threadpool(
+        ingest_papers, session, collection, [body], embeddings,
+        content_collection)
+    await run_in_threadpool(utils.get_vector_store().add, ids, embeddings)
+    await run_in_threadpool(utils.add_citations, session, ids)
+
+    return PaperBase(id=ids[0], title=body.title)
+
+
+@router.post(
+    path="/papers",
+    summary="Upload many papers to database in one transaction",
+    response_model=list[PaperBase]
+)
+async def upload_papers(
+    body: list[Metadata],
+    collection: CollectionDep,
+    content_collection: ContentCollectionDep,
+    session: SessionDep,
+):
+    if not body:
+        return []
 
-    # Create references
-    for ref_title in data.reference:
-        ref_paper: Paper = create_paper(
-            session=session,
-            texts={'title': ref_title},
-            dummy=True
-        )
-        paper.references.append(ref_paper)
-    session.commit()
+    # Embed all papers before the session checks out a connection
+    texts = [{'title': d.title, 'abstract': d.abstract} for d in body]
+    embeddings = await run_inference(
+        utils.create_embeddings, texts, settings.INGEST_EMBED_BATCH_SIZE)
 
-    return PaperBase(id=paper.id, title=data.title)
+    ids = await run_in_threadpool(
+        ingest_papers, session, collection, body, embeddings, content_collection)
+    await run_in_threadpool(utils.get_vector_store().add, ids, embeddings)
+    await run_in_threadpool(utils.add_citations, session, ids)
+
+    return [PaperBase(id=id, title=d.title) for id, d in zip(ids, body)]
+
+
+@router.post(
+    path="/paper/async",
+    summary="Queue new paper for ingestion by the workers",
+    status_code=202,
+    response_model=IngestJobAccepted
+)
+def queue_paper(
+    body: Metadata,
+    session: SessionDep,
+    request_id: int | None = None,
+):
+    if request_id is not None and not session.get(UploadStatus, request_id):
+        raise HTTPException(status_code=404, detail="Upload status not found")
+
+    job = create_ingest_job(session, body, request_id)
+    return IngestJobAccepted(request_id=job.request_id, job_id=job.id)
+
+
+@router.get(
+    path="/job/{job_id}",
+    summary="Get state of queued ingestion job",
+    response_model=IngestJobSchema
+)
+def get_job(
+    session: SessionDep,
+    job_id: int
+):
+    job = get_ingest_job(session, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return IngestJobSchema(**job.to_dict())
 
 
 @router.get(
     path="/status/all",
-    summary="Get upload status of all papers",
+    summary="Get a page of upload statuses in request_id order",
     response_model=list[UploadStatusSchema]
 )
 def get_upload_status(
-    session: SessionDep
+    session: SessionDep,
+    response: Response,
+    after: int | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    incomplete: UploadStage | None = None,
+    filename: str | None = None,
+):
+    page = get_upload_status_page(session, after, limit, incomplete, filename)
+    # Pass as `after` to get the next page; absent on the last page
+    if len(page) == limit:
+        response.headers["X-Next-Cursor"] = str(page[-1].request_id)
+    return page
+
+
+@router.get(
+    path="/status/export",
+    summary="Stream all matching upload statuses as NDJSON"
+)
+def export_upload_status(
+    incomplete: UploadStage | None = None,
+    filename: str | None = None,
 ):
-    return get_all_upload_status(session)
+    # Owns its session, since the response outlives request dependencies
+    def lines():
+        with Session(engine) as session:
+            for status in iter_upload_status(session, incomplete, filename):
+                yield json.dumps(status.to_dict()) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get(
+    path="/status/events",
+    summary="Stream upload status changes as server-sent events"
+)
+async def stream_upload_status_events():
+    # Each event carries a status as JSON, sent when it is created or 
+    # updated; fetch /status/all first for the current statuses
+    async def events():
+        async for payload in utils.upload_status_listener.subscribe(
+            settings.STATUS_EVENTS_KEEPALIVE
+        ):
+            yield ": keepalive\n\n" if payload is None else f"data: {payload}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post(
@@ -92,3 +189,15 @@ def put_upload_status(
     new_status = UploadStatus(**status_data.model_dump())
     updated_status = update_upload_status(session, new_status)
     return UploadStatusSchema(**updated_status.to_dict())
+
+
+@router.patch(
+    path="/status",
+    summary="Update the stages of many uploads in one statement",
+    response_model=list[UploadStatusSchema]
+)
+def patch_upload_status(
+    session: SessionDep,
+    body: list[UploadStatusUpdate]
+):
+    return update_upload_status_many(session, body)
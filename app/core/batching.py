@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable
+
+import torch
+
+from app.core.embedding import Embedding
+
+
+class BatchStats:
+    """
+    Thread-safe counters for batch sizes and queue wait times
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes: Counter[int] = Counter()
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def record(self, waits: list[float], run: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.requests += len(waits)
+            self.batch_sizes[len(waits)] += 1
+            self.total_wait += sum(waits)
+            self.max_wait = max(self.max_wait, *waits)
+            self.total_run += run
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "mean_batch_size": self.requests / (self.batches or 1),
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_queue_wait_ms": 1e3 * self.total_wait / (self.requests or 1),
+                "max_queue_wait_ms": 1e3 * self.max_wait,
+                "mean_batch_run_ms": 1e3 * self.total_run / (self.batches or 1),
+            }
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into one batched call.
+
+    The first request in a batch waits at most `max_wait_ms` for others
+    to arrive, and a batch never exceeds `max_batch_size` items. Each
+    caller receives its own row of the batched result.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list[dict]], torch.Tensor],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1e3
+        self.stats = BatchStats()
+        self._queue: queue.Queue[tuple[dict, Future, float]] = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: dict) -> torch.Tensor:
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self) -> list[tuple[dict, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                output = self.fn([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            end = time.perf_counter()
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(output[i])
+            self.stats.record(
+                waits=[start - enqueued for _, _, enqueued in batch],
+                run=end - start,
+            )
+
+
+class BatchingEmbedding(Embedding):
+    """
+    Micro-batching wrapper around another `Embedding`
+    """
+
+    def __init__(
+        self, model: Embedding, max_batch_size: int, max_wait_ms: float
+    ):
+        self.model = model
+        self.encoder = MicroBatcher(
+            model.encode_batch, max_batch_size, max_wait_ms,
+            name="embedding-encode")
+        self.query_encoder = MicroBatcher(
+            model.encode_query_batch, max_batch_size, max_wait_ms,
+            name="embedding-encode-query")
+
+    @property
+    def name(self) -> str:
+        return self.model.name
+
+    def encode(self, text: dict) -> torch.Tensor:
+        return self.encoder.submit(text)
+
+    def encode_query(self, text: dict) -> torch.Tensor:
+        return self.query_encoder.submit(text)
+
+    def encode_batch(self, texts: list[dict]) -> torch.Tensor:
+        return self.model.encode_batch(texts)
+
+    def encode_query_batch(self, texts: list[dict]) -> torch.Tensor:
+        return self.model.encode_query_batch(texts)
+
+    def parameter_bytes(self) -> int | None:
+        return self.model.parameter_bytes()
+
+    def stats(self) -> dict:
+        return {
+            "encode": self.encoder.stats.to_dict(),
+            "encode_query": self.query_encoder.stats.to_dict(),
+        }
@@ -0,0 +1,239 @@
+import abc
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from sqlalchemy import Engine, text
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with optional per-entry TTL
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else float("inf")
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CacheBackend(metaclass=abc.ABCMeta):
+    """
+    Key-value store of serialized responses, with counters that are 
+    never evicted
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process backend on top of `LRUCache`
+
+    Counters are per-process too unless `engine` is given, in which case 
+    each counter is the PostgreSQL sequence named by its key, shared by 
+    every process writing to the database.
+    """
+
+    def __init__(self, maxsize: int, engine: Engine | None = None):
+        self.values = LRUCache(maxsize)
+        self.engine = engine
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self.values.set(key, value, ttl)
+
+    def counter(self, key: str) -> int:
+        if self.engine is None:
+            return self._counters.get(key, 0)
+        # Sequences are not transactional, so this sees every nextval
+        with self.engine.connect() as conn:
+            return conn.scalar(text(
+                "SELECT COALESCE(pg_sequence_last_value(CAST(:key AS regclass)), 0)"
+            ), {"key": key})
+
+    def incr(self, key: str) -> int:
+        if self.engine is None:
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0) + 1
+                return self._counters[key]
+        with self.engine.connect() as conn:
+            return conn.scalar(
+                text("SELECT nextval(CAST(:key AS regclass))"), {"key": key})
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend shared by all processes, over a client with the GET, SET and 
+    INCR commands of `redis.Redis`
+
+    Counters have no TTL, so a `volatile-*` eviction policy never evicts 
+    them.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def counter(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+
+class ResponseCache:
+    """
+    Caches rendered response bodies by request and corpus version
+
+    Keys embed the corpus version, which every write to papers or 
+    metadata increments, so cached responses of an older corpus are 
+    never read again and expire on their own. Backend errors are logged 
+    and treated as misses.
+    """
+
+    VERSION_KEY = "corpus_version"
+
+    def __init__(self, backend: CacheBackend, ttl: float | None = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, namespace: str, request: dict) -> str | None:
+        """
+        Returns the key of a request under the current corpus version, or 
+        None if the backend is unavailable.
+        """
+        body = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(body.encode()).hexdigest()
+        try:
+            version = self.backend.counter(self.VERSION_KEY)
+        except Exception:
+            logger.warning("Response cache unavailable", exc_info=True)
+            return None
+        return f"response:{namespace}:{version}:{digest}"
+
+    def get(self, key: str | None) -> bytes | None:
+        body = None
+        if key is not None:
+            try:
+                body = self.backend.get(key)
+            except Exception:
+                logger.warning("Response cache unavailable", exc_info=True)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    def set(self, key: str | None, body: bytes) -> None:
+        """
+        Stores a response body under a key from `key`.
+        """
+        if key is None:
+            return
+        try:
+            self.backend.set(key, body, self.ttl)
+        except Exception:
+            logger.warning("Response cache unavailable", exc_info=True)
+
+    def bump_version(self) -> None:
+        """
+        Invalidates all cached responses. Call after committing writes.
+        """
+        try:
+            self.backend.incr(self.VERSION_KEY)
+        except Exception:
+            logger.error("Failed to bump corpus version", exc_info=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,4 +1,12 @@
-from pydantic import AnyUrl, MongoDsn, PostgresDsn, computed_field
+from typing import Literal
+
+from pydantic import (
+    AnyUrl,
+    MongoDsn,
+    PostgresDsn,
+    computed_field,
+    model_validator,
+)
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings
 
@@ -17,6 +25,8 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "password"
     POSTGRES_SERVER: str = "localhost"
     POSTGRES_PORT: int = 5432
+    # Logs every statement, which is costly under load
+    SQLALCHEMY_ECHO: bool = False
 
     @computed_field
     @property
@@ -28,12 +38,44 @@ class Settings(BaseSettings):
             host=self.POSTGRES_SERVER,
             port=self.POSTGRES_PORT,
         )
+
+    # pgvector index configurations
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat"] = "hnsw"
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_LISTS: int = 100
+    IVFFLAT_PROBES: int = 10
+    # "halfvec" and "binary" search the compact embedding columns for 
+    # num_retrieval * VECTOR_RERANK_FACTOR candidates, then re-rank them 
+    # by exact cosine distance
+    VECTOR_SEARCH_MODE: Literal["full", "halfvec", "binary"] = "full"
+    VECTOR_RERANK_FACTOR: int = 10
+    # "memory" searches an in-process copy of the embeddings, loaded from 
+    # a snapshot built by app.scripts.build_vector_snapshot, which must 
+    # exist, and synced from PostgreSQL every VECTOR_STORE_SYNC_INTERVAL 
+    # seconds
+    VECTOR_STORE: Literal["postgres", "memory"] = "postgres"
+    VECTOR_SNAPSHOT_DIR: str = "snapshots/vectors"
+    VECTOR_STORE_SYNC_INTERVAL: float = 30.0
+    # Filtered searches keep scanning the index until enough rows pass
+    # the filters (pgvector 0.8+), visiting at most HNSW_MAX_SCAN_TUPLES
+    # rows; IVFFlat only supports "relaxed_order". Use "off" before 0.8
+    VECTOR_ITERATIVE_SCAN: Literal["off", "strict_order", "relaxed_order"] = "strict_order"
+    HNSW_MAX_SCAN_TUPLES: int = 20000
+    # Filters matching at most this many papers skip the index and are
+    # searched exactly
+    VECTOR_PREFILTER_THRESHOLD: int = 10000
     
+
     # MongoDB configurations
     MONGO_HOST: str = "localhost"
     MONGO_PORT: int = 27017
     MONGO_DATABASE: str = "you-only-search-once"
     MONGO_COLLECTION: str = "dev"
+    # Optional collection holding the large body/figures/tables arrays, 
+    # keeping search documents small; unset stores them inline
+    MONGO_CONTENT_COLLECTION: str | None = None
 
     @computed_field
     @property
@@ -45,7 +87,81 @@ class Settings(BaseSettings):
         )
     
     # Embedding
-    EMBEDDING_MODEL: Embedding = Specter2()
+    # "onnx" serves SPECTER2 on ONNX Runtime, exporting the graphs to 
+    # ONNX_MODEL_DIR on first start. ONNX_QUANTIZE embeds under a model 
+    # name of its own, so stored papers need app.scripts.reembed first
+    EMBEDDING_BACKEND: Literal["torch", "onnx"] = "torch"
+    ONNX_MODEL_DIR: str = "models/onnx"
+    ONNX_QUANTIZE: bool = False
+    # 0 lets ONNX Runtime pick one thread per physical core
+    ONNX_INTRA_OP_THREADS: int = 0
+    # Loaded from EMBEDDING_BACKEND unless set explicitly
+    EMBEDDING_MODEL: Embedding | None = None
+    # Micro-batching of concurrent encode calls; 1 disables batching
+    EMBEDDING_MAX_BATCH_SIZE: int = 16
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    # Cache of query embeddings; size 0 disables caching
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL: float = 3600.0
+    # Cache of search responses, keyed on the request and a corpus version 
+    # that writes bump; size 0 disables the "memory" backend. Both backends 
+    # share the version across processes, "memory" through a PostgreSQL 
+    # sequence and "redis" through a redis key
+    RESPONSE_CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL: float = 3600.0
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # Threads running model inference off the event loop; keep at least 
+    # EMBEDDING_MAX_BATCH_SIZE so full batches can form
+    INFERENCE_WORKERS: int = 16
+
+    # Bulk ingestion
+    INGEST_EMBED_BATCH_SIZE: int = 32
+    # pg_trgm similarity (0-1) at which an unknown reference title 
+    # resolves to an existing paper; unset matches exact titles only
+    REFERENCE_FUZZY_MATCH_THRESHOLD: float | None = None
+
+    # Ingestion workers (python -m app.worker)
+    INGEST_WORKERS: int = 1
+    INGEST_JOB_BATCH_SIZE: int = 32
+    # Seconds an idle worker sleeps before polling for jobs again
+    INGEST_POLL_INTERVAL: float = 1.0
+    # Seconds a claimed job stays invisible to other workers; jobs of a 
+    # worker that dies are picked up again after this
+    INGEST_JOB_LEASE: float = 600.0
+    # Failed jobs are retried after INGEST_RETRY_BACKOFF * 2^(attempt - 1) 
+    # seconds until INGEST_MAX_ATTEMPTS attempts were made
+    INGEST_MAX_ATTEMPTS: int = 5
+    INGEST_RETRY_BACKOFF: float = 10.0
+
+    # Share of the search ranking given to citation centrality, from the 
+    # PageRank stored by app.scripts.pagerank; vector searches re-rank 
+    # CENTRALITY_CANDIDATES times as many candidates as they return
+    CENTRALITY_WEIGHT: float = 0.0
+    CENTRALITY_CANDIDATES: int = 4
+    # Seconds between reloads of the in-memory citation graph behind 
+    # GET /search/path, once loaded, picking up citations stored by the 
+    # ingestion workers
+    CITATION_GRAPH_REFRESH_INTERVAL: float = 600.0
+    # Seconds without status changes after which GET /upload/status/events 
+    # sends a comment, keeping proxies from closing the stream
+    STATUS_EVENTS_KEEPALIVE: float = 15.0
+    # Status changes a client of GET /upload/status/events may fall behind 
+    # before its stream is closed
+    STATUS_EVENTS_QUEUE_SIZE: int = 1000
+
+    @model_validator(mode="after")
+    def load_embedding_model(self):
+        if self.EMBEDDING_MODEL is None:
+            if self.EMBEDDING_BACKEND == "onnx":
+                self.EMBEDDING_MODEL = Specter2Onnx(
+                    model_dir=self.ONNX_MODEL_DIR,
+                    quantize=self.ONNX_QUANTIZE,
+                    intra_op_threads=self.ONNX_INTRA_OP_THREADS,
+                )
+            else:
+                self.EMBEDDING_MODEL = Specter2()
+        return self
     
 
 settings = Settings()
@@ -1,19 +1,29 @@
 from pymongo import MongoClient
 from pymongo.collection import Collection
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, Sequence, create_engine
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
+from app.core.metrics import MongoPoolListener
 
 # PostgreSQL
-engine: Engine = create_engine(str(settings.SQLALCHEMY_DATABSE_URI), echo=True)
+engine: Engine = create_engine(
+    str(settings.SQLALCHEMY_DATABSE_URI), echo=settings.SQLALCHEMY_ECHO)
 Base = declarative_base()
+# Version of the corpus, bumped after every write; keys cached responses
+corpus_version = Sequence("corpus_version", metadata=Base.metadata)
 
 # MongoDB
 client = MongoClient(
     str(settings.MONGO_CONNECTION_STRING),
     uuidRepresentation='standard',
+    event_listeners=[MongoPoolListener()],
 )
 collection: Collection = (client
                           .get_database(settings.MONGO_DATABASE)
                           .get_collection(settings.MONGO_COLLECTION))
+content_collection: Collection | None = None
+if settings.MONGO_CONTENT_COLLECTION:
+    content_collection = (client
+                          .get_database(settings.MONGO_DATABASE)
+                          .get_collection(settings.MONGO_CONTENT_COLLECTION))
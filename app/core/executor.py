@@ -0,0 +1,28 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.core.config import settings
+
+
+T = TypeVar("T")
+
+# Dedicated pool so model inference never competes with the default 
+# threadpool that serves sync dependencies and blocking CRUD calls
+inference_executor = ThreadPoolExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    thread_name_prefix="inference",
+)
+
+
+async def run_inference(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Runs a CPU-bound model call on the inference executor without 
+    blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(inference_executor, call)
@@ -0,0 +1,371 @@
+import logging
+import threading
+import uuid
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.models.paper import Paper, association_table
+
+
+logger = logging.getLogger(__name__)
+
+# Edges converted to arrays at a time while loading
+LOAD_CHUNK_ROWS = 100000
+
+# Every edge as a pair of paper numbers, numbering papers in id order
+LOAD_EDGES_SQL = text("""
+WITH nodes AS (
+    SELECT id, (row_number() OVER (ORDER BY id) - 1)::integer AS i
+    FROM paper
+)
+SELECT s.i, t.i
+FROM "references" r
+JOIN nodes s ON s.id = r.paper_id
+JOIN nodes t ON t.id = r.referencing_paper_id
+""")
+
+
+class CitationGraph:
+    """
+    Citations between papers as compressed sparse row adjacency arrays
+
+    Papers are numbered by their position in `ids`, which is sorted, so
+    ids are mapped to numbers by binary search. Row `i` of the out arrays
+    lists the papers that paper `i` cites, and of the in arrays the
+    papers citing it, as sorted int32 numbers. Citations added after
+    loading are kept in small adjacency dicts next to the arrays until
+    the graph is reloaded.
+    """
+
+    def __init__(self, ids: np.ndarray, sources: np.ndarray, targets: np.ndarray):
+        self.ids = ids
+        self.out_offsets, self.out_indices = _csr(len(ids), sources, targets)
+        self.in_offsets, self.in_indices = _csr(len(ids), targets, sources)
+
+        self._lock = threading.Lock()
+        # (numbers of papers added since loading, added cited papers by
+        # paper, added citing papers by paper), swapped as a whole so
+        # searches never see a partial update
+        self._state: tuple[
+            dict[uuid.UUID, int], dict[int, list[int]], dict[int, list[int]]
+        ] = ({}, {}, {})
+        # Built on first use by `transition_matrix`
+        self._transition: sparse.csr_matrix | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._state[0])
+
+    @classmethod
+    def load(cls, session: Session) -> "CitationGraph":
+        """
+        Loads every paper and citation from one snapshot of the database.
+        """
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        ids = np.array([
+            id.bytes for id in session.scalars(
+                select(Paper.id).order_by(Paper.id)
+                .execution_options(yield_per=LOAD_CHUNK_ROWS))
+        ], dtype="S16")
+
+        chunks = [np.empty((0, 2), dtype=np.int32)]
+        result = session.execute(
+            LOAD_EDGES_SQL.execution_options(yield_per=LOAD_CHUNK_ROWS))
+        for partition in result.partitions():
+            chunks.append(np.array(partition, dtype=np.int32))
+        edges = np.concatenate(chunks)
+
+        logger.info(
+            "Loaded citation graph of %d papers and %d citations",
+            len(ids), len(edges))
+        return cls(ids, edges[:, 0], edges[:, 1])
+
+    def paper_ids(self, start: int = 0, stop: int | None = None) -> list[uuid.UUID]:
+        """
+        Returns the ids of the loaded papers numbered `start` to `stop`.
+        """
+        return [_to_uuid(key) for key in self.ids[start:stop]]
+
+    def transition_matrix(self) -> sparse.csr_matrix:
+        """
+        Returns the matrix of a random walk along citations: row `i`
+        spreads the weight of paper `i` evenly over the papers it cites,
+        and is empty if it cites none. Shares the index arrays of the
+        graph and covers the loaded papers only.
+        """
+        with self._lock:
+            if self._transition is None:
+                counts = np.diff(self.out_offsets)
+                weights = np.repeat(
+                    (1 / np.maximum(counts, 1)).astype(np.float32), counts)
+                # Matching index dtypes keep scipy from copying the indices
+                offsets = self.out_offsets
+                if len(self.out_indices) <= np.iinfo(np.int32).max:
+                    offsets = offsets.astype(np.int32)
+                self._transition = sparse.csr_matrix(
+                    (weights, self.out_indices, offsets),
+                    shape=(len(self.ids), len(self.ids)))
+            return self._transition
+
+    def add(self, edges: list[tuple[uuid.UUID, uuid.UUID]]) -> None:
+        """
+        Adds `(citing, cited)` edges, and papers not in the graph yet.
+        """
+        with self._lock:
+            nodes, added_out, added_in = (dict(d) for d in self._state)
+            for src, dst in edges:
+                s, t = self._add_node(src, nodes), self._add_node(dst, nodes)
+                if self._has_edge(s, t, added_out):
+                    continue
+                # Lists are replaced rather than appended to, since
+                # searches may be reading the old ones
+                added_out[s] = added_out.get(s, []) + [t]
+                added_in[t] = added_in.get(t, []) + [s]
+            self._state = (nodes, added_out, added_in)
+
+    def add_papers(self, session: Session, ids: list[uuid.UUID]) -> None:
+        """
+        Adds the citations of the given papers as stored in PostgreSQL.
+        """
+        stmt = (select(association_table.c.paper_id,
+                       association_table.c.referencing_paper_id)
+                .where(association_table.c.paper_id.in_(ids)))
+        self.add([tuple(edge) for edge in session.execute(stmt)])
+
+    def cites(self, citing: uuid.UUID, cited: uuid.UUID) -> bool:
+        nodes, added_out, _ = self._state
+        s, t = self._node(citing, nodes), self._node(cited, nodes)
+        return s is not None and t is not None and self._has_edge(s, t, added_out)
+
+    def shortest_path(
+        self,
+        source: uuid.UUID,
+        target: uuid.UUID,
+        max_hops: int,
+        directed: bool = False,
+    ) -> list[uuid.UUID] | None:
+        """
+        Returns the papers on a shortest path of at most `max_hops`
+        citations from `source` to `target`, or None if there is none.
+        Citations are followed either way unless `directed`, where each
+        paper on the path cites the next one.
+
+        Searches breadth-first from both ends at once, expanding the
+        smaller frontier one level at a time, so a path of length d
+        visits about twice the papers within d/2 hops instead of all
+        those within d hops.
+        """
+        nodes, added_out, added_in = self._state
+        s, t = self._node(source, nodes), self._node(target, nodes)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return [source]
+
+        # Per side: the paper each reached paper was reached from, or -1
+        n = len(self.ids) + len(nodes)
+        parents = (np.full(n, -1, dtype=np.int32), np.full(n, -1, dtype=np.int32))
+        parents[0][s], parents[1][t] = s, t
+        frontiers = [np.array([s], dtype=np.int32), np.array([t], dtype=np.int32)]
+        # The source side follows citations forwards, the target side backwards
+        directions = ((True, not directed), (not directed, True))
+
+        hops = 0
+        while hops < max_hops:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            outgoing, incoming = directions[side]
+            neighbors, via = self._expand(
+                frontiers[side], outgoing, incoming, added_out, added_in)
+
+            unseen = parents[side][neighbors] == -1
+            neighbors, first = np.unique(neighbors[unseen], return_index=True)
+            parents[side][neighbors] = via[unseen][first]
+            hops += 1
+
+            # The first level reaching the other side gives a shortest path
+            meets = neighbors[parents[1 - side][neighbors] != -1]
+            if len(meets):
+                return self._path(meets[0], s, t, parents, nodes)
+            if len(neighbors) == 0:
+                return None
+            frontiers[side] = neighbors
+        return None
+
+    def personalized_pagerank(
+        self,
+        seeds: dict[uuid.UUID, float],
+        num_results: int,
+        damping: float = 0.85,
+        iterations: int = 20,
+        epsilon: float = 1e-5,
+    ) -> list[tuple[uuid.UUID, float]]:
+        """
+        Ranks papers other than the seeds by PageRank personalized to 
+        `seeds`: how likely a walk along citations, restarting at a seed 
+        in proportion to its weight, is to be at the paper. Returns
+        `(id, score)` pairs by descending score.
+
+        Sums the first `iterations` steps of the walk as sparse vectors,
+        dropping papers reached with less than `epsilon` of the weight,
+        so only the neighborhood of the seeds is visited. Citations 
+        added since loading are not followed.
+        """
+        transition = self.transition_matrix()
+        rows = {
+            i: weight for id, weight in seeds.items()
+            if (i := self._node(id, {})) is not None and weight > 0}
+        if not rows:
+            return []
+
+        total = sum(rows.values())
+        walk = sparse.csr_matrix(
+            (np.array([w / total for w in rows.values()], dtype=np.float32),
+             (np.zeros(len(rows), dtype=np.int32), list(rows))),
+            shape=(1, len(self.ids)))
+        scores = sparse.csr_matrix((1, len(self.ids)), dtype=np.float32)
+        for _ in range(iterations):
+            walk = (walk @ transition) * damping
+            walk.data[walk.data < epsilon] = 0
+            walk.eliminate_zeros()
+            if walk.nnz == 0:
+                break
+            scores = scores + walk
+
+        scores = scores.tocoo()
+        keep = ~np.isin(scores.col, list(rows))
+        papers, values = scores.col[keep], scores.data[keep] * (1 - damping)
+        top = np.argsort(-values)[:num_results]
+        return [
+            (_to_uuid(self.ids[papers[i]]), float(values[i]))
+        for i in top]
+
+    def _expand(
+        self,
+        frontier: np.ndarray,
+        outgoing: bool,
+        incoming: bool,
+        added_out: dict[int, list[int]],
+        added_in: dict[int, list[int]],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the neighbors of the frontier papers and, for each, the
+        frontier paper it is a neighbor of.
+        """
+        neighbors, via = [], []
+        for enabled, offsets, indices, added in (
+            (outgoing, self.out_offsets, self.out_indices, added_out),
+            (incoming, self.in_offsets, self.in_indices, added_in),
+        ):
+            if not enabled:
+                continue
+            rows = frontier[frontier < len(self.ids)]
+            starts, counts = offsets[rows], offsets[rows + 1] - offsets[rows]
+            positions = (np.repeat(starts - np.cumsum(counts) + counts, counts)
+                         + np.arange(counts.sum()))
+            neighbors.append(indices[positions])
+            via.append(np.repeat(rows, counts).astype(np.int32))
+
+            if added:
+                keys = np.fromiter(added, dtype=np.int32, count=len(added))
+                for u in keys[np.isin(keys, frontier)]:
+                    neighbors.append(np.array(added[u], dtype=np.int32))
+                    via.append(np.full(len(added[u]), u, dtype=np.int32))
+        return np.concatenate(neighbors), np.concatenate(via)
+
+    def _path(
+        self,
+        meet: int,
+        s: int,
+        t: int,
+        parents: tuple[np.ndarray, np.ndarray],
+        nodes: dict[uuid.UUID, int],
+    ) -> list[uuid.UUID]:
+        path = [meet]
+        while path[-1] != s:
+            path.append(parents[0][path[-1]])
+        path.reverse()
+        while path[-1] != t:
+            path.append(parents[1][path[-1]])
+
+        added_ids = {i: id for id, i in nodes.items()}
+        return [
+            _to_uuid(self.ids[i]) if i < len(self.ids) else added_ids[i]
+        for i in path]
+
+    def _node(self, id: uuid.UUID, nodes: dict[uuid.UUID, int]) -> int | None:
+        if id in nodes:
+            return nodes[id]
+        i = int(np.searchsorted(self.ids, id.bytes))
+        if i < len(self.ids) and _to_uuid(self.ids[i]) == id:
+            return i
+        return None
+
+    def _add_node(self, id: uuid.UUID, nodes: dict[uuid.UUID, int]) -> int:
+        i = self._node(id, nodes)
+        if i is None:
+            i = nodes[id] = len(self.ids) + len(nodes)
+        return i
+
+    def _has_edge(self, s: int, t: int, added_out: dict[int, list[int]]) -> bool:
+        if t in added_out.get(s, ()):
+            return True
+        if s >= len(self.ids):
+            return False
+        row = self.out_indices[self.out_offsets[s]:self.out_offsets[s + 1]]
+        i = np.searchsorted(row, t)
+        return bool(i < len(row) and row[i] == t)
+
+
+def pagerank(
+    transition: sparse.csr_matrix,
+    damping: float = 0.85,
+    tolerance: float = 1e-6,
+    max_iterations: int = 100,
+) -> tuple[np.ndarray, int]:
+    """
+    Computes PageRank by power iteration over the matrix of a random 
+    walk, scaled so the average paper scores 1. Walks at papers citing 
+    nothing continue at a random paper. Returns the scores and the 
+    number of iterations run.
+    """
+    n = transition.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.float32), 0
+
+    # The transpose is a CSC view sharing the arrays of `transition`
+    walk = transition.T
+    dangling = np.diff(transition.indptr) == 0
+    ranks = np.full(n, 1 / n, dtype=np.float32)
+    for iteration in range(1, max_iterations + 1):
+        teleport = (damping * ranks[dangling].sum() + 1 - damping) / n
+        new = damping * (walk @ ranks) + np.float32(teleport)
+        change = np.abs(new - ranks).sum(dtype=np.float64)
+        ranks = new
+        if change < tolerance:
+            break
+    return ranks * n, iteration
+
+
+def load_citation_graph() -> CitationGraph:
+    with Session(engine) as session:
+        return CitationGraph.load(session)
+
+
+def _csr(n: int, rows: np.ndarray, cols: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the offsets and column indices of the `n`-row CSR matrix
+    with the given entries, each row's columns sorted.
+    """
+    # One sort of a combined key is much faster than np.lexsort
+    order = np.argsort(rows.astype(np.int64) * max(n, 1) + cols)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, cols[order].astype(np.int32)
+
+
+def _to_uuid(key: bytes) -> uuid.UUID:
+    # NumPy drops trailing zero bytes of fixed-width byte strings
+    return uuid.UUID(bytes=key.ljust(16, b"\0"))
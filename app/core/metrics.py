@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+from prometheus_client import Gauge, Histogram
+from pymongo import monitoring
+from sqlalchemy import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+T = TypeVar("T")
+
+STAGE_SECONDS = Histogram(
+    "yoso_stage_seconds",
+    "Time spent in a stage of request handling",
+    ["stage", "operation"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+SQL_POOL_CONNECTIONS = Gauge(
+    "yoso_sql_pool_connections",
+    "Connections of the SQLAlchemy pool by state",
+    ["state"],
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "yoso_mongo_pool_connections",
+    "Connections of the MongoDB pools by state",
+    ["state"],
+)
+
+# Milliseconds per stage of the current request, reported as Server-Timing
+_timings: contextvars.ContextVar[dict[str, float] | None] = \
+    contextvars.ContextVar("timings", default=None)
+# Stages being timed in the current context, so nested calls of one
+# stage are only counted once
+_active: contextvars.ContextVar[frozenset[str]] = \
+    contextvars.ContextVar("active_stages", default=frozenset())
+
+
+@contextmanager
+def timer(stage: str, operation: str = "") -> Iterator[None]:
+    """
+    Records the time spent in the block under `stage`, unless the block
+    runs inside another timer of the same stage.
+    """
+    active = _active.get()
+    if stage in active:
+        yield
+        return
+
+    token = _active.set(active | {stage})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _active.reset(token)
+        STAGE_SECONDS.labels(stage, operation).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+def timed(stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Decorates a function to be timed under `stage`, with the function
+    name as the operation.
+    """
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> T:
+            with timer(stage, fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ServerTimingMiddleware:
+    """
+    Adds the stage timings of each request as a Server-Timing header
+
+    Timings recorded in threads count too, since `run_in_threadpool` and
+    `run_inference` run calls in a copy of the request context.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timings["total"] = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", ", ".join(
+                    f"{stage};dur={ms:.1f}" for stage, ms in timings.items()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _timings.reset(token)
+
+
+def observe_sql_pool(engine: Engine) -> None:
+    pool = engine.pool
+    SQL_POOL_CONNECTIONS.labels("checked_out").set(pool.checkedout())
+    SQL_POOL_CONNECTIONS.labels("checked_in").set(pool.checkedin())
+    SQL_POOL_CONNECTIONS.labels("overflow").set(max(pool.overflow(), 0))
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks open and checked out MongoDB connections
+    """
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels("open").dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.labels("checked_out").dec()
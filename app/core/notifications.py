@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+
+import psycopg
+from psycopg import sql
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Queued to end a subscription
+_CLOSED = object()
+
+
+class NotificationListener:
+    """
+    Fans the PostgreSQL notifications of one channel out to subscribers
+
+    A single connection, outside the SQLAlchemy pool, listens for the
+    whole process, and each subscriber reads from a queue of its own.
+    Subscriptions end when notifications may have been missed: when the
+    subscriber falls `maxsize` notifications behind, or the connection
+    is lost, in which case the listener reconnects.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.maxsize = maxsize
+        self._queues: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """
+        Starts listening on the running event loop. Returns once the
+        connection listens, so later notifications are delivered.
+        """
+        conn = await self._connect()
+        self._task = asyncio.create_task(self._run(conn))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._close_all()
+
+    async def subscribe(self, timeout: float) -> AsyncIterator[str | None]:
+        """
+        Yields the payloads of notifications from the first iteration
+        on, or None after `timeout` seconds without one.
+        """
+        if self._task is None:
+            raise RuntimeError(f"Not listening on {self.channel}")
+        queue = asyncio.Queue(self.maxsize)
+        self._queues.add(queue)
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if payload is _CLOSED:
+                    return
+                yield payload
+        finally:
+            self._queues.discard(queue)
+
+    async def _connect(self) -> psycopg.AsyncConnection:
+        conn = await psycopg.AsyncConnection.connect(
+            str(settings.SQLALCHEMY_DATABSE_URI), autocommit=True)
+        await conn.execute(
+            sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        return conn
+
+    async def _run(self, conn: psycopg.AsyncConnection | None) -> None:
+        while True:
+            try:
+                if conn is None:
+                    conn = await self._connect()
+                async with conn:
+                    async for notify in conn.notifies():
+                        self._publish(notify.payload)
+            except Exception:
+                logger.exception("Listening on %s failed", self.channel)
+            conn = None
+            self._close_all()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    def _publish(self, payload: str) -> None:
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning("Dropping a subscriber to %s behind by %d",
+                               self.channel, self.maxsize)
+                self._close(queue)
+
+    def _close(self, queue: asyncio.Queue) -> None:
+        self._queues.discard(queue)
+        if queue.full():
+            # The subscription ends anyway, so make room for the marker
+            queue.get_nowait()
+        queue.put_nowait(_CLOSED)
+
+    def _close_all(self) -> None:
+        for queue in list(self._queues):
+            self._close(queue)
@@ -0,0 +1,463 @@
+import abc
+import datetime
+import json
+import logging
+import pathlib
+import threading
+import uuid
+
+import numpy as np
+import torch
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.paper import Paper
+from app.models.schemas import PaperFilter
+
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 768
+
+# Rows scored per matmul, bounding the float32 copy of float16 snapshots
+SCORE_CHUNK_ROWS = 65536
+
+# Re-read this much before the last sync, since rows committed after it
+# may carry an earlier transaction start time as `updated_at`
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class VectorStore(metaclass=abc.ABCMeta):
+    """
+    Interface for nearest neighbor search over paper embeddings
+
+    PostgreSQL is the source of truth; other stores hold a copy that
+    `add` and `sync` keep up to date.
+    """
+
+    @abc.abstractmethod
+    def search(
+        self,
+        session: Session,
+        query_emb: torch.Tensor,
+        num_retrieval: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        filters: PaperFilter | None = None,
+    ) -> list[tuple[uuid.UUID, float]]:
+        """
+        Returns `(id, cosine similarity)` of the most similar papers 
+        matching `filters`.
+        """
+        raise NotImplementedError
+
+    def add(self, ids: list[uuid.UUID], embeddings: torch.Tensor) -> None:
+        pass
+
+    def sync(self, session: Session) -> None:
+        pass
+
+
+def set_search_params(
+    session: Session,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    iterative: bool = False,
+) -> None:
+    """
+    Sets ANN search parameters for the current transaction only. 
+    `iterative` enables iterative index scans for filtered searches.
+    """
+    params = {
+        "hnsw.ef_search": ef_search or settings.HNSW_EF_SEARCH,
+        "ivfflat.probes": probes or settings.IVFFLAT_PROBES,
+    }
+    if iterative and settings.VECTOR_ITERATIVE_SCAN != "off":
+        params |= {
+            "hnsw.iterative_scan": settings.VECTOR_ITERATIVE_SCAN,
+            "hnsw.max_scan_tuples": settings.HNSW_MAX_SCAN_TUPLES,
+            "ivfflat.iterative_scan": "relaxed_order",
+        }
+    session.execute(select(*[
+        func.set_config(name, str(value), True)
+        for name, value in params.items()
+    ]))
+
+
+def filter_clauses(filters: PaperFilter | None) -> list:
+    """
+    Returns WHERE clauses on `paper` for the given filters.
+    """
+    if filters is None:
+        return []
+    clauses = []
+    if filters.year_from is not None:
+        clauses.append(Paper.published_year >= filters.year_from)
+    if filters.year_to is not None:
+        clauses.append(Paper.published_year <= filters.year_to)
+    if filters.min_impact is not None:
+        clauses.append(Paper.impact >= filters.min_impact)
+    if filters.authors:
+        clauses.append(Paper.authors.overlap(filters.authors))
+    return clauses
+
+
+class PostgresVectorStore(VectorStore):
+    """
+    Searches the pgvector indexes of the `paper` table
+
+    With VECTOR_SEARCH_MODE set to "halfvec" or "binary", an index
+    search over the compact embeddings picks candidates that are
+    re-ranked by exact cosine distance of the full embeddings.
+    """
+
+    def search(
+        self,
+        session: Session,
+        query_emb: torch.Tensor,
+        num_retrieval: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        filters: PaperFilter | None = None,
+    ) -> list[tuple[uuid.UUID, float]]:
+        clauses = filter_clauses(filters)
+        if clauses and self._is_selective(session, clauses):
+            return self._search_exact(session, query_emb, num_retrieval, clauses)
+
+        distance = Paper.embedding.cosine_distance(query_emb)
+        stmt = (select(Paper.id, (1 - distance).label("score"))
+                .where(Paper.embedding_model == settings.EMBEDDING_MODEL.name)
+                .order_by(distance)
+                .limit(num_retrieval))
+
+        if settings.VECTOR_SEARCH_MODE != "full":
+            num_candidates = num_retrieval * settings.VECTOR_RERANK_FACTOR
+            # HNSW returns at most ef_search rows per scan
+            ef_search = max(ef_search or settings.HNSW_EF_SEARCH, num_candidates)
+            candidates = self._candidates(query_emb, num_candidates, clauses)
+            stmt = stmt.join(candidates, Paper.id == candidates.c.id)
+        elif clauses:
+            stmt = stmt.where(*clauses)
+
+        set_search_params(session, ef_search, probes, iterative=bool(clauses))
+        if clauses:
+            # Relaxed iterative scans may return rows slightly out of order
+            stmt = stmt.cte("results").prefix_with("MATERIALIZED")
+            stmt = select(stmt.c.id, stmt.c.score).order_by(stmt.c.score.desc())
+        result = session.execute(stmt).all()
+        return [(id, score) for id, score in result]
+
+    def _is_selective(self, session: Session, clauses: list) -> bool:
+        threshold = settings.VECTOR_PREFILTER_THRESHOLD
+        # Counting stops after threshold + 1 matches
+        matches = (select(Paper.id)
+                   .where(*clauses)
+                   .limit(threshold + 1)
+                   .subquery())
+        return session.scalar(select(func.count()).select_from(matches)) <= threshold
+
+    def _search_exact(
+        self,
+        session: Session,
+        query_emb: torch.Tensor,
+        num_retrieval: int,
+        clauses: list,
+    ) -> list[tuple[uuid.UUID, float]]:
+        # Materialized so matches are found by the filter indexes and 
+        # scored exactly instead of scanning the vector index
+        matches = (select(Paper.id, Paper.embedding)
+                   .where(Paper.embedding_model == settings.EMBEDDING_MODEL.name)
+                   .where(*clauses)
+                   .cte("matches")
+                   .prefix_with("MATERIALIZED"))
+        distance = matches.c.embedding.cosine_distance(query_emb)
+        stmt = (select(matches.c.id, (1 - distance).label("score"))
+                .order_by(distance)
+                .limit(num_retrieval))
+        result = session.execute(stmt).all()
+        return [(id, score) for id, score in result]
+
+    def _candidates(
+        self, query_emb: torch.Tensor, num_candidates: int, clauses: list
+    ):
+        if settings.VECTOR_SEARCH_MODE == "binary":
+            column = Paper.embedding_bit
+            query = func.binary_quantize(cast(query_emb, Vector(DIMENSIONS)))
+            distance = column.hamming_distance(query)
+        else:
+            column = Paper.embedding_half
+            distance = column.cosine_distance(query_emb)
+
+        # Materialized so the candidate scan stays on the compact index
+        return (select(Paper.id)
+                .where(column != None)
+                .where(Paper.embedding_model == settings.EMBEDDING_MODEL.name)
+                .where(*clauses)
+                .order_by(distance)
+                .limit(num_candidates)
+                .cte("candidates")
+                .prefix_with("MATERIALIZED"))
+
+
+class MemoryVectorStore(VectorStore):
+    """
+    In-process index over a memory-mapped snapshot and the embeddings
+    added since it was taken
+
+    Rows are L2-normalized, so dot products are cosine similarities.
+    Snapshot arrays are opened with mmap, so processes on one host share
+    the pages through the OS page cache instead of each holding a copy.
+    Snapshots with IVF lists are searched approximately, scanning only
+    the `probes` lists whose centroids are closest to the query; added
+    embeddings are always searched exactly. Filtered searches go to 
+    PostgreSQL, which holds the filtered columns.
+
+    Added embeddings are appended to arrays grown geometrically, so
+    adding costs time proportional to the rows added. Rows of papers
+    added again are masked rather than overwritten, since searches may
+    be reading them, and compacted away once they outnumber live rows.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.ids = np.empty(0, dtype="S16")
+        self.embeddings = np.empty((0, DIMENSIONS), dtype=np.float32)
+        self.centroids: np.ndarray | None = None
+        self.offsets: np.ndarray | None = None
+        self.watermark: datetime.datetime | None = None
+
+        # Without a snapshot, the first sync would pull every embedding 
+        # through `add`
+        path = pathlib.Path(directory) if directory else None
+        if path and not (path / "meta.json").exists():
+            raise FileNotFoundError(
+                f"No vector snapshot in {path}; build one with "
+                "python -m app.scripts.build_vector_snapshot")
+        if path:
+            self._load(path)
+
+        # Sorted copy of the ids for finding rows replaced by `add`
+        self._order = np.argsort(self.ids)
+        self._sorted_ids = self.ids[self._order]
+
+        self._lock = threading.Lock()
+        # Added rows fill the first `_count` slots of these buffers
+        self._ids_buffer = np.empty(0, dtype="S16")
+        self._rows_buffer = np.empty((0, DIMENSIONS), dtype=np.float32)
+        self._count = 0
+        # Slot of the latest added row of each paper, by id bytes
+        self._slots: dict[bytes, int] = {}
+        # Latest `updated_at` applied by `sync` of papers in its overlap
+        self._synced: dict[uuid.UUID, datetime.datetime] = {}
+        # (snapshot rows replaced by added rows, added ids, added rows,
+        # added rows replaced by later ones), swapped as a whole so 
+        # searches never see a partial update
+        self._state = (
+            np.zeros(len(self.ids), dtype=bool),
+            self._ids_buffer,
+            self._rows_buffer,
+            np.empty(0, dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        stale, added_ids, _, replaced = self._state
+        return (len(self.ids) - int(stale.sum())
+                + len(added_ids) - int(replaced.sum()))
+
+    def _load(self, path: pathlib.Path) -> None:
+        meta = json.loads((path / "meta.json").read_text())
+        if meta.get("model") != settings.EMBEDDING_MODEL.name:
+            raise ValueError(
+                f"Vector snapshot in {path} is of model {meta.get('model')}, "
+                f"not {settings.EMBEDDING_MODEL.name}")
+        self.ids = np.load(path / "ids.npy", mmap_mode="r")
+        self.embeddings = np.load(path / "embeddings.npy", mmap_mode="r")
+        if (path / "centroids.npy").exists():
+            self.centroids = np.load(path / "centroids.npy")
+            self.offsets = np.load(path / "offsets.npy")
+        if meta["watermark"]:
+            self.watermark = datetime.datetime.fromisoformat(meta["watermark"])
+        logger.info(
+            "Loaded vector snapshot of %d papers from %s", len(self.ids), path)
+
+    def search(
+        self,
+        session: Session,
+        query_emb: torch.Tensor,
+        num_retrieval: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        filters: PaperFilter | None = None,
+    ) -> list[tuple[uuid.UUID, float]]:
+        if filter_clauses(filters):
+            return PostgresVectorStore().search(
+                session, query_emb, num_retrieval, ef_search, probes, filters)
+
+        stale, added_ids, added, replaced = self._state
+        query = normalize(query_emb.numpy().astype(np.float32))
+
+        if self.centroids is None:
+            rows = None
+            scores = _score(self.embeddings, query)
+            scores[stale] = -np.inf
+        else:
+            nprobe = min(probes or settings.IVFFLAT_PROBES, len(self.centroids))
+            lists = _top_k(self.centroids @ query, nprobe)
+            starts, stops = self.offsets[lists], self.offsets[lists + 1]
+            rows = np.concatenate([
+                np.arange(start, stop) for start, stop in zip(starts, stops)])
+            scores = np.concatenate([
+                _score(self.embeddings[start:stop], query)
+            for start, stop in zip(starts, stops)])
+            scores[stale[rows]] = -np.inf
+
+        results = [
+            (self.ids[i if rows is None else rows[i]], scores[i])
+        for i in _top_k(scores, num_retrieval)]
+        added_scores = added @ query
+        added_scores[replaced] = -np.inf
+        results += [
+            (added_ids[i], added_scores[i])
+        for i in _top_k(added_scores, num_retrieval)]
+        results.sort(key=lambda result: -result[1])
+        return [
+            (_to_uuid(id), float(score))
+        for id, score in results[:num_retrieval] if score > -np.inf]
+
+    def add(self, ids: list[uuid.UUID], embeddings: torch.Tensor) -> None:
+        """
+        Makes new or changed embeddings searchable, replacing any
+        snapshot rows of the same papers.
+        """
+        embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+        # Later rows win when ids repeat
+        rows = list({id.bytes: i for i, id in enumerate(ids)}.items())
+        keys = np.array([key for key, _ in rows], dtype="S16")
+        embeddings = embeddings[[i for _, i in rows]]
+        with self._lock:
+            stale, _, _, replaced = self._state
+            stale = stale.copy()
+            stale[self._find(keys)] = True
+            replaced = np.concatenate([replaced, np.zeros(len(keys), dtype=bool)])
+            replaced[[self._slots[key] for key in keys if key in self._slots]] = True
+
+            # Slots past `_count` are not visible to searches yet, so 
+            # they are written in place
+            start, stop = self._count, self._count + len(keys)
+            if stop > len(self._ids_buffer):
+                self._grow(max(stop, 2 * len(self._ids_buffer)))
+            self._ids_buffer[start:stop] = keys
+            self._rows_buffer[start:stop] = embeddings
+            self._slots.update(zip(keys.tolist(), range(start, stop)))
+            self._count = stop
+            self._state = (
+                stale,
+                self._ids_buffer[:stop],
+                self._rows_buffer[:stop],
+                replaced,
+            )
+            if replaced.sum() > stop // 2:
+                self._compact()
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Moves the added rows to buffers of `capacity` rows. Searches keep 
+        reading the old buffers until the state is swapped.
+        """
+        ids = np.empty(capacity, dtype="S16")
+        rows = np.empty((capacity, DIMENSIONS), dtype=np.float32)
+        ids[:self._count] = self._ids_buffer[:self._count]
+        rows[:self._count] = self._rows_buffer[:self._count]
+        self._ids_buffer, self._rows_buffer = ids, rows
+
+    def _compact(self) -> None:
+        """
+        Drops added rows replaced by later ones.
+        """
+        stale, added_ids, added, replaced = self._state
+        live = ~replaced
+        self._count = int(live.sum())
+        self._ids_buffer = added_ids[live]
+        self._rows_buffer = added[live]
+        self._slots = dict(zip(self._ids_buffer.tolist(), range(self._count)))
+        self._state = (
+            stale,
+            self._ids_buffer,
+            self._rows_buffer,
+            np.zeros(self._count, dtype=bool),
+        )
+
+    def sync(self, session: Session) -> None:
+        """
+        Adds embeddings written to PostgreSQL since the last sync. Rows 
+        read again in the overlap window are skipped unless they changed.
+        """
+        stmt = (select(Paper.id, Paper.embedding, Paper.updated_at)
+                .where(Paper.embedding_model == settings.EMBEDDING_MODEL.name))
+        if self.watermark is not None:
+            stmt = stmt.where(Paper.updated_at > self.watermark - SYNC_OVERLAP)
+
+        ids, embeddings, watermark, synced = [], [], self.watermark, {}
+        for id, embedding, updated_at in session.execute(
+                stmt.execution_options(yield_per=1000)):
+            watermark = max(watermark or updated_at, updated_at)
+            synced[id] = updated_at
+            if self._synced.get(id) == updated_at:
+                continue
+            ids.append(id)
+            embeddings.append(embedding)
+
+        if ids:
+            self.add(ids, np.stack(embeddings))
+        self.watermark = watermark
+        # Only rows inside the next overlap window can be read again
+        if watermark is not None:
+            self._synced = {
+                id: updated_at for id, updated_at in synced.items()
+                if updated_at > watermark - SYNC_OVERLAP}
+
+    def _find(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the snapshot rows of the given ids that are present.
+        """
+        if len(self._sorted_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self._sorted_ids, keys)
+        positions = np.minimum(positions, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == keys
+        return self._order[positions[found]]
+
+
+def sync_vector_store(store: VectorStore) -> None:
+    with Session(engine) as session:
+        store.sync(session)
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.float32, copy=False)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the indices of the `k` highest scores, highest first.
+    """
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _score(embeddings: np.ndarray, query: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.asarray(embeddings[i:i + SCORE_CHUNK_ROWS], dtype=np.float32) @ query
+    for i in range(0, len(embeddings), SCORE_CHUNK_ROWS)] or [np.empty(0)])
+
+
+def _to_uuid(key: bytes) -> uuid.UUID:
+    # NumPy drops trailing zero bytes of fixed-width byte strings
+    return uuid.UUID(bytes=key.ljust(16, b"\0"))
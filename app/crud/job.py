@@ -0,0 +1,121 @@
+import datetime
+
+from sqlalchemy import func, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import IngestJob
+from app.models.metadata import Metadata
+from app.models.status import UploadStatus
+
+
+# =========================================================
+# Create
+# =========================================================
+def create_ingest_job(
+    session: Session, data: Metadata, request_id: int | None = None
+) -> IngestJob:
+    """
+    Queues a paper for the ingestion workers. Without `request_id`, an 
+    upload status named after the paper title is created to track it.
+    """
+    if request_id is None:
+        upload_status = UploadStatus(filename=data.title)
+        session.add(upload_status)
+        session.flush()
+        request_id = upload_status.request_id
+
+    job = IngestJob(request_id=request_id, payload=data.model_dump(mode="json"))
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+# =========================================================
+# Read
+# =========================================================
+def get_ingest_job(session: Session, job_id: int) -> IngestJob | None:
+    return session.get(IngestJob, job_id)
+
+
+# =========================================================
+# Update
+# =========================================================
+def claim_ingest_jobs(
+    session: Session, limit: int, lease: float
+) -> list[IngestJob]:
+    """
+    Claims up to `limit` due jobs for `lease` seconds, skipping rows 
+    another worker is claiming concurrently. Running jobs whose lease 
+    expired are claimed again, or marked failed once they used up 
+    INGEST_MAX_ATTEMPTS attempts. Commits.
+    """
+    exhausted = (select(IngestJob.id)
+                 .where(IngestJob.status == "running")
+                 .where(IngestJob.run_at <= func.now())
+                 .where(IngestJob.attempts >= settings.INGEST_MAX_ATTEMPTS)
+                 .with_for_update(skip_locked=True))
+    session.execute(update(IngestJob)
+                    .where(IngestJob.id.in_(exhausted.scalar_subquery()))
+                    .values(status="failed", last_error="Lease expired"))
+
+    due = (select(IngestJob.id)
+           .where(or_(
+               IngestJob.status == "pending",
+               (IngestJob.status == "running")
+               & (IngestJob.attempts < settings.INGEST_MAX_ATTEMPTS)))
+           .where(IngestJob.run_at <= func.now())
+           .order_by(IngestJob.run_at)
+           .limit(limit)
+           .with_for_update(skip_locked=True))
+    stmt = (update(IngestJob)
+            .where(IngestJob.id.in_(due.scalar_subquery()))
+            .values(
+                status="running",
+                attempts=IngestJob.attempts + 1,
+                run_at=func.now() + datetime.timedelta(seconds=lease),
+            )
+            .returning(IngestJob))
+    jobs = session.scalars(stmt).all()
+    session.commit()
+    return sorted(jobs, key=lambda job: job.id)
+
+
+def complete_ingest_jobs(session: Session, jobs: list[IngestJob]) -> None:
+    """
+    Marks jobs done and their uploads as loaded into the database. Jobs 
+    whose lease expired and was claimed again are left to their new 
+    worker.
+    """
+    leases = [(job.id, job.run_at) for job in jobs]
+    request_ids = session.scalars(
+        update(IngestJob)
+        .where(tuple_(IngestJob.id, IngestJob.run_at).in_(leases))
+        .where(IngestJob.status == "running")
+        .values(status="done", last_error=None)
+        .returning(IngestJob.request_id)).all()
+    session.execute(update(UploadStatus)
+                    .where(UploadStatus.request_id.in_(request_ids))
+                    .values(db_loaded=True))
+    session.commit()
+
+
+def fail_ingest_job(session: Session, job: IngestJob, error: str) -> None:
+    """
+    Schedules a retry of a failed job with exponential backoff, or marks 
+    it failed for good after INGEST_MAX_ATTEMPTS attempts. Does nothing 
+    if the job's lease expired and was claimed again.
+    """
+    values = {"status": "failed", "last_error": error}
+    if job.attempts < settings.INGEST_MAX_ATTEMPTS:
+        delay = settings.INGEST_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        values |= {
+            "status": "pending",
+            "run_at": func.now() + datetime.timedelta(seconds=delay),
+        }
+    session.execute(update(IngestJob)
+                    .where(IngestJob.id == job.id)
+                    .where(IngestJob.run_at == job.run_at)
+                    .values(**values))
+    session.commit()
@@ -1,26 +1,142 @@
 import uuid
 
+from pymongo import ReplaceOne
 from pymongo.collection import Collection
-from pymongo.results import InsertOneResult
+from pymongo.results import BulkWriteResult, InsertOneResult
 
-from app.models.metadata import Metadata
+import app.utils as utils
+from app.core.metrics import timed
+from app.models.metadata import Metadata, MetadataSummary
+
+
+# Large arrays that may live in a separate content collection
+CONTENT_FIELDS = ('body', 'figures', 'tables')
+
+# Only the fields search responses render
+SUMMARY_PROJECTION = {field: True for field in MetadataSummary.model_fields}
 
 
 # =========================================================
 # Create
 # =========================================================
+@timed("mongo")
 def create_metadata(
-    collection: Collection, id: uuid.UUID, data: Metadata
+    collection: Collection,
+    id: uuid.UUID,
+    data: Metadata,
+    content_collection: Collection | None = None,
 ) -> InsertOneResult:
     data_dict = data.model_dump()
     data_dict |= {'_id': id}
+    if content_collection is not None:
+        content = {k: data_dict.pop(k) for k in CONTENT_FIELDS}
+        content_collection.insert_one(content | {'_id': id})
     result = collection.insert_one(data_dict)
+    utils.response_cache.bump_version()
+    return result
+
+
+@timed("mongo")
+def upsert_metadata_many(
+    collection: Collection,
+    data: dict[uuid.UUID, Metadata],
+    content_collection: Collection | None = None,
+) -> BulkWriteResult:
+    """
+    Writes metadata of many papers in one unordered bulk request. 
+    Documents are replaced by id, so re-uploads and retries are safe.
+    """
+    docs = [d.model_dump() | {'_id': id} for id, d in data.items()]
+    if content_collection is not None:
+        contents = [
+            {k: doc.pop(k) for k in CONTENT_FIELDS} | {'_id': doc['_id']}
+        for doc in docs]
+        content_collection.bulk_write([
+            ReplaceOne({'_id': c['_id']}, c, upsert=True) for c in contents
+        ], ordered=False)
+    result = collection.bulk_write([
+        ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in docs
+    ], ordered=False)
+    utils.response_cache.bump_version()
     return result
 
 
 # =========================================================
 # Read
 # =========================================================
-def get_metadata_by_id(collection: Collection, id: uuid.UUID) -> Metadata:
+@timed("mongo")
+def get_metadata_by_id(
+    collection: Collection,
+    id: uuid.UUID,
+    content_collection: Collection | None = None,
+) -> Metadata:
     result = collection.find_one({'_id': id})
+    if result is not None and content_collection is not None:
+        result |= _get_contents(content_collection, [id]).get(id, {})
     return Metadata.model_validate(result)
+
+
+@timed("mongo")
+def get_metadata_by_ids(
+    collection: Collection,
+    ids: list[uuid.UUID],
+    content_collection: Collection | None = None,
+) -> dict[uuid.UUID, Metadata]:
+    """
+    Fetches metadata of several papers in one round trip. Entries follow
+    the order of `ids`; ids without a document are skipped.
+    """
+    cursor = collection.find({'_id': {'$in': list(ids)}})
+    docs = {doc['_id']: doc for doc in cursor}
+    if content_collection is not None:
+        for id, content in _get_contents(content_collection, ids).items():
+            if id in docs:
+                docs[id] |= content
+    return {id: Metadata.model_validate(docs[id]) for id in ids if id in docs}
+
+
+@timed("mongo")
+def get_metadata_summaries_by_ids(
+    collection: Collection, ids: list[uuid.UUID]
+) -> dict[uuid.UUID, MetadataSummary]:
+    """
+    Like `get_metadata_by_ids`, but projects only the fields of
+    `MetadataSummary` so body, figures, tables and references are never
+    read or transferred.
+    """
+    return {
+        id: MetadataSummary.model_validate(doc)
+    for id, doc in get_metadata_summary_dicts_by_ids(collection, ids).items()}
+
+
+@timed("mongo")
+def get_metadata_summary_dicts_by_ids(
+    collection: Collection, ids: list[uuid.UUID]
+) -> dict[uuid.UUID, dict]:
+    """
+    Like `get_metadata_summaries_by_ids`, but returns plain dicts with 
+    every `MetadataSummary` field. Documents were validated when they 
+    were uploaded, so they are not validated again.
+    """
+    cursor = collection.find({'_id': {'$in': list(ids)}}, SUMMARY_PROJECTION)
+    docs = {doc['_id']: doc for doc in cursor}
+    return {
+        id: {field: docs[id].get(field) for field in MetadataSummary.model_fields}
+    for id in ids if id in docs}
+
+
+@timed("mongo")
+def get_abstracts_by_ids(
+    collection: Collection, ids: list[uuid.UUID]
+) -> dict[uuid.UUID, str]:
+    cursor = collection.find({'_id': {'$in': list(ids)}}, {'abstract': True})
+    return {doc['_id']: doc['abstract'] for doc in cursor}
+
+
+def _get_contents(
+    content_collection: Collection, ids: list[uuid.UUID]
+) -> dict[uuid.UUID, dict]:
+    cursor = content_collection.find({'_id': {'$in': list(ids)}})
+    return {
+        doc.pop('_id'): doc
+    for doc in cursor}
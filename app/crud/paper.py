@@ -1,59 +1,311 @@
 import uuid
 
-from sqlalchemy import select
+import torch
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, Integer, Uuid, bindparam, func, select, text, union
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session, aliased
 
 import app.utils as utils
-from app.models.paper import Paper
+from app.core.config import settings
+from app.core.metrics import timed
+from app.models.paper import Paper, association_table
+from app.models.schemas import PaperFilter
 
 
 # =========================================================
 # Create
 # =========================================================
-def create_paper(session: Session, texts: dict, dummy: bool = False) -> Paper:
-    embedding = None
-    if not dummy:
-        embedding = utils.create_embedding(texts).detach()
-    
-    paper = Paper(
-        title=(texts.get("title") or ""),
-        normalized_title=utils.normalize_text(texts.get("title") or ""),
-        embedding=embedding
-    )
-    session.add(paper)
+@timed("pg")
+def create_paper(
+    session: Session,
+    texts: dict,
+    dummy: bool = False,
+    embedding: torch.Tensor | None = None,
+) -> Paper | None:
+    """
+    Creates a paper, or returns the existing paper with the same 
+    normalized title. Unless `dummy`, the given title and embedding are 
+    written, upgrading an existing placeholder paper in place. Returns 
+    None for placeholders whose titles normalize to nothing.
+    """
+    if not dummy and embedding is None:
+        embedding = utils.create_embedding(texts)
+
+    title = texts.get("title") or ""
+    if dummy:
+        ids = resolve_reference_titles(session, [title], fuzzy=False)
+    else:
+        ids = upsert_papers(session, [{
+            "title": title,
+            "embedding": embedding,
+            "embedding_model": utils.get_embedding_model().name,
+        }])
     session.commit()
-    session.refresh(paper)
-    return paper
+    utils.response_cache.bump_version()
+
+    if dummy and not ids:
+        # Placeholders need a title that can be matched
+        return None
+    return session.get(Paper, ids[paper_title_key(title)])
+
+
+# Rows per multi-row INSERT, keeping statements well below parameter limits
+INSERT_CHUNK_SIZE = 1000
+
+# Titles normalizing to "" (non-Latin or punctuation only) cannot be 
+# matched, so the unique index and ON CONFLICT clauses leave them out
+HAS_TITLE_KEY = Paper.normalized_title != ""
+
+
+def paper_title_key(title: str) -> str:
+    """
+    Key of a title in the results of `upsert_papers`: its normalized 
+    form, or the title itself if that normalizes to nothing.
+    """
+    return utils.normalize_text(title) or title
+
+
+@timed("pg")
+def upsert_papers(session: Session, rows: list[dict]) -> dict[str, uuid.UUID]:
+    """
+    Inserts papers given as dicts of column values including `title`, 
+    with multi-row INSERT ... ON CONFLICT (normalized_title) statements. 
+    Existing papers get the given values, which upgrades placeholder 
+    papers in place. Papers whose titles normalize to nothing are 
+    always inserted as new papers. Returns paper ids by 
+    `paper_title_key`. Does not commit.
+    """
+    # Later rows win when titles repeat; sorting keeps lock order stable
+    rows = {paper_title_key(row["title"]): row for row in rows}
+    result = {}
+    keyed = sorted(
+        (key, row) for key, row in rows.items()
+        if utils.normalize_text(row["title"]))
+    for chunk in utils.chunked(keyed, INSERT_CHUNK_SIZE):
+        stmt = insert(Paper).values([
+            row | {"id": uuid.uuid4(), "normalized_title": key}
+        for key, row in chunk])
+        stmt = (stmt
+                .on_conflict_do_update(
+                    index_elements=[Paper.normalized_title],
+                    index_where=HAS_TITLE_KEY,
+                    set_={k: stmt.excluded[k] for k in chunk[0][1]}
+                    | {"updated_at": func.now()})
+                .returning(Paper.normalized_title, Paper.id))
+        result |= dict(session.execute(stmt).all())
+
+    unkeyed = [
+        (key, row) for key, row in rows.items()
+        if not utils.normalize_text(row["title"])]
+    for key, row in unkeyed:
+        stmt = (insert(Paper)
+                .values(row | {"id": uuid.uuid4(), "normalized_title": ""})
+                .returning(Paper.id))
+        result[key] = session.scalar(stmt)
+    return result
+
+
+@timed("pg")
+def resolve_reference_titles(
+    session: Session, titles: list[str], fuzzy: bool = True
+) -> dict[str, uuid.UUID]:
+    """
+    Maps titles to paper ids in bulk, inserting placeholder papers 
+    without embeddings for unknown titles with INSERT ... ON CONFLICT DO 
+    NOTHING RETURNING. If `fuzzy` and REFERENCE_FUZZY_MATCH_THRESHOLD is 
+    set, unknown titles first try the most similar existing title by 
+    pg_trgm similarity. Titles normalizing to nothing cannot be matched 
+    and are skipped. Returns paper ids by normalized title. Does not 
+    commit.
+    """
+    titles = {utils.normalize_text(t): t for t in titles}
+    titles.pop("", None)
+    result = get_paper_ids_by_titles(session, list(titles))
+
+    missing = sorted(t for t in titles if t not in result)
+    if missing and fuzzy and settings.REFERENCE_FUZZY_MATCH_THRESHOLD:
+        result |= get_paper_ids_by_similar_titles(
+            session, missing, settings.REFERENCE_FUZZY_MATCH_THRESHOLD)
+        missing = [t for t in missing if t not in result]
+
+    for chunk in utils.chunked(missing, INSERT_CHUNK_SIZE):
+        stmt = (insert(Paper)
+                .values([
+                    {"id": uuid.uuid4(), "title": titles[t], "normalized_title": t}
+                for t in chunk])
+                .on_conflict_do_nothing(
+                    index_elements=[Paper.normalized_title],
+                    index_where=HAS_TITLE_KEY)
+                .returning(Paper.normalized_title, Paper.id))
+        result |= dict(session.execute(stmt).all())
+
+    # Titles inserted concurrently by another transaction
+    missing = [t for t in missing if t not in result]
+    if missing:
+        result |= get_paper_ids_by_titles(session, missing)
+    return result
+
+
+@timed("pg")
+def create_references(
+    session: Session, edges: list[tuple[uuid.UUID, uuid.UUID]]
+) -> None:
+    """
+    Inserts `(paper_id, referencing_paper_id)` edges in bulk, skipping 
+    existing ones. Does not commit.
+    """
+    for chunk in utils.chunked(edges, INSERT_CHUNK_SIZE):
+        stmt = insert(association_table).values([
+            {"paper_id": src, "referencing_paper_id": dst}
+        for src, dst in chunk])
+        session.execute(stmt.on_conflict_do_nothing())
 
 
 # =========================================================
 # Read
 # =========================================================
 def get_papers_by_similarity(
-    session: Session, query: dict, num_retrieval: int
+    session: Session,
+    query: dict,
+    num_retrieval: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filters: PaperFilter | None = None,
 ) -> list[Paper]:
-    query_emb = utils.create_query_embedding(query).detach()
-    stmt = (select(Paper)
-            .where(Paper.embedding != None)
-            .order_by(Paper.embedding.cosine_distance(query_emb))
-            .limit(num_retrieval))
-    result = session.scalars(stmt).all()
-    return result
+    query_emb = utils.create_query_embedding(query)
+    return get_papers_by_embedding(
+        session, query_emb, num_retrieval, ef_search, probes, filters)
+
+
+def get_papers_by_embedding(
+    session: Session,
+    query_emb: torch.Tensor,
+    num_retrieval: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filters: PaperFilter | None = None,
+) -> list[Paper]:
+    result = search_paper_ids(
+        session, query_emb, num_retrieval, ef_search, probes, filters)
+    papers = {
+        paper.id: paper
+    for paper in get_papers_by_ids(session, [id for id, _ in result])}
+    return [papers[id] for id, _ in result if id in papers]
+
+
+@timed("vector_search")
+def search_paper_ids(
+    session: Session,
+    query_emb: torch.Tensor,
+    num_retrieval: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filters: PaperFilter | None = None,
+    centrality_weight: float = 0.0,
+) -> list[tuple[uuid.UUID, float]]:
+    """
+    Searches the configured vector store for the papers most similar to 
+    `query_emb` that match `filters`. Returns `(id, score)` pairs by 
+    descending score. With a `centrality_weight`, CENTRALITY_CANDIDATES 
+    times as many candidates are re-ranked by similarity blended with 
+    their PageRank.
+    """
+    store = utils.get_vector_store()
+    if not centrality_weight:
+        return store.search(
+            session, query_emb, num_retrieval, ef_search, probes, filters)
 
+    candidates = store.search(
+        session, query_emb, num_retrieval * settings.CENTRALITY_CANDIDATES,
+        ef_search, probes, filters)
+    pageranks = dict(session.execute(
+        select(Paper.id, Paper.pagerank)
+        .where(Paper.id.in_([id for id, _ in candidates]))).all())
+    result = [
+        (id, blend_centrality(score, pageranks.get(id), centrality_weight))
+    for id, score in candidates]
+    result.sort(key=lambda item: -item[1])
+    return result[:num_retrieval]
 
+
+def blend_centrality(
+    score: float, pagerank: float | None, weight: float
+) -> float:
+    """
+    Blends a similarity score with a PageRank mapped into [0, 1), where 
+    the average paper gets 0.5. Papers without a PageRank count as 
+    uncited. `EXPAND_REFERENCES_SQL` and `get_similar_references` blend 
+    the same way in SQL.
+    """
+    pagerank = pagerank or 0.0
+    return (1 - weight) * score + weight * pagerank / (1 + pagerank)
+
+
+@timed("pg")
 def get_paper_by_id(session: Session, paper_id: uuid.UUID) -> Paper | None:
     stmt = select(Paper).where(Paper.id == paper_id)
     result = session.scalar(stmt)
     return result
 
 
+@timed("pg")
+def get_papers_by_ids(session: Session, ids: list[uuid.UUID]) -> list[Paper]:
+    stmt = select(Paper).where(Paper.id.in_(ids))
+    result = session.scalars(stmt).all()
+    return result
+
+
+@timed("pg")
 def get_paper_by_title(session: Session, title: str) -> Paper | None:
     norm_title = utils.normalize_text(title)
+    if not norm_title:
+        return None
     stmt = select(Paper).where(Paper.normalized_title == norm_title)
     result = session.scalar(stmt)
     return result
 
 
+@timed("pg")
+def get_paper_ids_by_titles(
+    session: Session, titles: list[str]
+) -> dict[str, uuid.UUID]:
+    """
+    Maps normalized titles to existing paper ids.
+    """
+    stmt = (select(Paper.normalized_title, Paper.id)
+            .where(Paper.normalized_title.in_(titles)))
+    return dict(session.execute(stmt).all())
+
+
+MATCH_SIMILAR_TITLES_SQL = text("""
+SELECT t.title, m.id
+FROM unnest(CAST(:titles AS text[])) AS t(title)
+CROSS JOIN LATERAL (
+    SELECT p.id
+    FROM paper p
+    WHERE p.normalized_title % t.title
+    ORDER BY p.normalized_title <-> t.title
+    LIMIT 1
+) m
+""")
+
+
+@timed("pg")
+def get_paper_ids_by_similar_titles(
+    session: Session, titles: list[str], threshold: float
+) -> dict[str, uuid.UUID]:
+    """
+    Maps normalized titles to the paper with the most similar normalized 
+    title, if its pg_trgm similarity is at least `threshold`.
+    """
+    session.execute(select(func.set_config(
+        "pg_trgm.similarity_threshold", str(threshold), True)))
+    result = session.execute(MATCH_SIMILAR_TITLES_SQL, {"titles": titles})
+    return dict(result.all())
+
+
+@timed("pg")
 def get_references_by_id(session: Session, paper_id: uuid.UUID) -> list[Paper]:
     ref_alias = aliased(Paper)
     ref_to_stmt = (select(Paper)
@@ -71,19 +323,211 @@ def get_references_by_id(session: Session, paper_id: uuid.UUID) -> list[Paper]:
     return ref_to_result + ref_by_result
 
 
+@timed("pg")
+def get_similar_references(
+    session: Session,
+    paper_id: uuid.UUID,
+    query_emb: torch.Tensor,
+    num_retrieval: int,
+    centrality_weight: float = 0.0,
+) -> list[tuple[uuid.UUID, float]]:
+    """
+    Ranks papers citing or cited by `paper_id` by cosine similarity to 
+    `query_emb`, blended with their PageRank by `centrality_weight`, in 
+    a single query. Returns `(id, score)` pairs without loading any 
+    embeddings.
+    """
+    refs = association_table.c
+    neighbors = union(
+        select(refs.referencing_paper_id.label("id"))
+        .where(refs.paper_id == paper_id),
+        select(refs.paper_id.label("id"))
+        .where(refs.referencing_paper_id == paper_id),
+    ).subquery()
+
+    score = 1 - Paper.embedding.cosine_distance(query_emb)
+    if centrality_weight:
+        pagerank = func.coalesce(Paper.pagerank, 0.0)
+        score = ((1 - centrality_weight) * score
+                 + centrality_weight * pagerank / (1 + pagerank))
+    stmt = (select(Paper.id, score.label("score"))
+            .join(neighbors, Paper.id == neighbors.c.id)
+            .where(Paper.embedding_model == utils.get_embedding_model().name)
+            .order_by(score.desc())
+            .limit(num_retrieval))
+    result = session.execute(stmt).all()
+    return [(id, score) for id, score in result]
+
+
+# Beam search over citation edges in both directions. Each level keeps the
+# `beam_width` neighbors of the previous level most similar to the query, 
+# blended with their PageRank by `weight` as in `blend_centrality`; `path` 
+# stops a branch from walking back through its own ancestors.
+# `seen` holds every node kept at earlier levels, so nodes only compete 
+# for the beam at the level they are first reached
+EXPAND_REFERENCES_SQL = text("""
+WITH RECURSIVE walk(id, parent_id, depth, score, seen) AS (
+    SELECT p.id, NULL::uuid, 0, NULL::float8, ARRAY[p.id]
+    FROM paper p
+    WHERE p.id = :paper_id
+  UNION ALL
+    SELECT ranked.id, ranked.parent_id, ranked.depth, ranked.score,
+           ranked.seen || array_agg(ranked.id) OVER ()
+    FROM (
+        SELECT level.*, row_number() OVER (ORDER BY level.score DESC) AS rank
+        FROM (
+            SELECT DISTINCT ON (p.id)
+                p.id,
+                w.id AS parent_id,
+                w.depth + 1 AS depth,
+                (1 - :weight) * (1 - (p.embedding <=> :query_emb))
+                    + :weight * COALESCE(p.pagerank, 0) / (1 + COALESCE(p.pagerank, 0))
+                    AS score,
+                w.seen
+            FROM walk w
+            CROSS JOIN LATERAL (
+                SELECT r.referencing_paper_id AS id
+                FROM "references" r WHERE r.paper_id = w.id
+                UNION
+                SELECT r.paper_id
+                FROM "references" r WHERE r.referencing_paper_id = w.id
+            ) n
+            JOIN paper p ON p.id = n.id
+            WHERE w.depth < :depth
+              AND p.embedding_model = :model
+              AND p.id <> ALL (w.seen)
+            ORDER BY p.id, w.score DESC NULLS LAST
+        ) level
+    ) ranked
+    WHERE ranked.rank <= :beam_width
+)
+SELECT id, parent_id, depth, score
+FROM walk
+WHERE depth > 0
+ORDER BY depth, score DESC
+LIMIT :num_nodes
+""").bindparams(
+    bindparam("query_emb", type_=Vector(768)),
+    bindparam("weight", type_=Float()),
+)
+
+
+@timed("pg")
+def expand_references(
+    session: Session,
+    paper_id: uuid.UUID,
+    query_emb: torch.Tensor,
+    depth: int,
+    beam_width: int,
+    num_nodes: int | None = None,
+    centrality_weight: float = 0.0,
+) -> list[tuple[uuid.UUID, uuid.UUID, int, float]]:
+    """
+    Expands the citation graph around `paper_id` up to `depth` hops in a 
+    single recursive query, keeping the `beam_width` nodes most similar 
+    to `query_emb` among those first reached at each level, with 
+    similarity blended with PageRank by `centrality_weight`. Returns up 
+    to `num_nodes` `(id, parent_id, depth, score)` rows ordered by depth 
+    and descending score; a node reachable from several branches is 
+    reported once, at its shallowest depth.
+    """
+    result = session.execute(EXPAND_REFERENCES_SQL, {
+        "paper_id": paper_id,
+        "query_emb": query_emb,
+        "depth": depth,
+        "beam_width": beam_width,
+        "num_nodes": num_nodes,
+        "weight": centrality_weight,
+        "model": utils.get_embedding_model().name,
+    }).all()
+    return [(id, parent_id, d, score) for id, parent_id, d, score in result]
+
+
 # =========================================================
 # Update
 # =========================================================
-def update_paper(session: Session, texts: dict) -> Paper:
+@timed("pg")
+def update_paper(
+    session: Session, texts: dict, embedding: torch.Tensor | None = None
+) -> Paper:
     # Find paper
     norm_title = utils.normalize_text(texts['title'])
     stmt = (select(Paper).where(Paper.normalized_title == norm_title))
     paper = session.scalar(stmt)
 
     # Update value
-    embedding = utils.create_embedding(texts).detach()
+    if embedding is None:
+        embedding = utils.create_embedding(texts)
     paper.title = texts['title']
     paper.embedding = embedding
+    paper.embedding_model = utils.get_embedding_model().name
     session.commit()
+    utils.response_cache.bump_version()
     session.refresh(paper)
     return paper
+
+
+UPDATE_EMBEDDINGS_SQL = text("""
+UPDATE paper p
+SET embedding = v.embedding, embedding_model = :model, updated_at = now()
+FROM unnest(CAST(:ids AS uuid[]), CAST(:embeddings AS vector[])) AS v(id, embedding)
+WHERE p.id = v.id
+""").bindparams(
+    bindparam("ids", type_=ARRAY(Uuid())),
+    bindparam("embeddings", type_=ARRAY(Vector(768))),
+)
+
+
+@timed("pg")
+def update_embeddings(
+    session: Session,
+    ids: list[uuid.UUID],
+    embeddings: torch.Tensor,
+    model_name: str,
+) -> None:
+    """
+    Replaces the embeddings of many papers in one UPDATE statement. 
+    Does not commit.
+    """
+    session.execute(UPDATE_EMBEDDINGS_SQL, {
+        "ids": ids,
+        "embeddings": list(embeddings.numpy()),
+        "model": model_name,
+    })
+
+
+# Leaves unchanged rows alone, and `updated_at` with them, so vector 
+# stores do not re-sync their embeddings
+UPDATE_CENTRALITY_SQL = text("""
+UPDATE paper p
+SET pagerank = v.pagerank, in_degree = v.in_degree
+FROM unnest(
+    CAST(:ids AS uuid[]),
+    CAST(:pageranks AS float8[]),
+    CAST(:in_degrees AS integer[])
+) AS v(id, pagerank, in_degree)
+WHERE p.id = v.id
+  AND (p.pagerank, p.in_degree) IS DISTINCT FROM (v.pagerank, v.in_degree)
+""").bindparams(
+    bindparam("ids", type_=ARRAY(Uuid())),
+    bindparam("pageranks", type_=ARRAY(Float())),
+    bindparam("in_degrees", type_=ARRAY(Integer())),
+)
+
+
+@timed("pg")
+def update_centrality(
+    session: Session,
+    ids: list[uuid.UUID],
+    pageranks: list[float],
+    in_degrees: list[int],
+) -> None:
+    """
+    Stores the PageRank and in-degree of many papers in one UPDATE 
+    statement. Does not commit.
+    """
+    session.execute(UPDATE_CENTRALITY_SQL, {
+        "ids": ids,
+        "pageranks": pageranks,
+        "in_degrees": in_degrees,
+    })
@@ -1,9 +1,26 @@
-from sqlalchemy import select, update
+from typing import Iterator, get_args
+
+from sqlalchemy import (
+    ARRAY,
+    Boolean,
+    Integer,
+    Select,
+    bindparam,
+    select,
+    text,
+    update,
+)
 from sqlalchemy.orm import Session
 
+from app.models.schemas import UploadStage, UploadStatusUpdate
 from app.models.status import UploadStatus
 
 
+# Channel of the NOTIFY that a trigger on `upload_status` sends for every 
+# created or updated status, with the status as a JSON payload
+UPLOAD_STATUS_CHANNEL = "upload_status"
+
+
 # =========================================================
 # Create
 # =========================================================
@@ -23,6 +40,51 @@ def get_all_upload_status(session: Session) -> list[UploadStatus]:
     return result
 
 
+def _select_upload_status(
+    incomplete: UploadStage | None = None, filename: str | None = None
+) -> Select:
+    stmt = select(UploadStatus).order_by(UploadStatus.request_id)
+    if incomplete is not None:
+        stmt = stmt.where(getattr(UploadStatus, incomplete) == False)
+    if filename is not None:
+        stmt = stmt.where(UploadStatus.filename == filename)
+    return stmt
+
+
+def get_upload_status_page(
+    session: Session,
+    after: int | None = None,
+    limit: int = 100,
+    incomplete: UploadStage | None = None,
+    filename: str | None = None,
+) -> list[UploadStatus]:
+    """
+    Returns up to `limit` statuses with `request_id` greater than 
+    `after`, in `request_id` order. `incomplete` keeps uploads that have 
+    not finished the given stage.
+    """
+    stmt = _select_upload_status(incomplete, filename).limit(limit)
+    if after is not None:
+        stmt = stmt.where(UploadStatus.request_id > after)
+    result = session.scalars(stmt).all()
+    return result
+
+
+def iter_upload_status(
+    session: Session,
+    incomplete: UploadStage | None = None,
+    filename: str | None = None,
+    chunk_size: int = 1000,
+) -> Iterator[UploadStatus]:
+    """
+    Yields all matching statuses in `request_id` order, fetching 
+    `chunk_size` rows at a time through a server-side cursor.
+    """
+    stmt = _select_upload_status(incomplete, filename)
+    yield from session.scalars(
+        stmt.execution_options(yield_per=chunk_size))
+
+
 # =========================================================
 # Update
 # =========================================================
@@ -30,3 +92,62 @@ def update_upload_status(session: Session, new: UploadStatus) -> UploadStatus:
     merged = session.merge(new)
     session.commit()
     return merged
+
+
+_STAGES = get_args(UploadStage)
+# Stages left NULL keep their value
+UPDATE_UPLOAD_STATUS_MANY_SQL = text(f"""
+WITH updated AS (
+    UPDATE upload_status s
+    SET {", ".join(f"{stage} = COALESCE(v.{stage}, s.{stage})" for stage in _STAGES)}
+    FROM unnest(
+        CAST(:request_ids AS integer[]),
+        {", ".join(f"CAST(:{stage} AS boolean[])" for stage in _STAGES)}
+    ) AS v(request_id, {", ".join(_STAGES)})
+    WHERE s.request_id = v.request_id
+    RETURNING s.*
+)
+SELECT * FROM updated
+ORDER BY request_id
+""").bindparams(
+    bindparam("request_ids", type_=ARRAY(Integer())),
+    *[bindparam(stage, type_=ARRAY(Boolean())) for stage in _STAGES],
+)
+
+
+def update_upload_status_many(
+    session: Session, updates: list[UploadStatusUpdate]
+) -> list[UploadStatus]:
+    """
+    Applies the stages set in each update in one UPDATE statement, 
+    without reading the rows first. Updates of the same upload are 
+    merged, a stage being set if any of them sets it. Returns the 
+    updated statuses in `request_id` order; unknown request ids are 
+    skipped.
+    """
+    if not updates:
+        return []
+    # An UPDATE changes each row at most once, whichever source row joins 
+    # first, so later updates of the same upload would be lost
+    merged: dict[int, dict[str, bool | None]] = {}
+    for u in updates:
+        stages = merged.setdefault(u.request_id, dict.fromkeys(_STAGES))
+        for stage in _STAGES:
+            value = getattr(u, stage)
+            if value is not None:
+                stages[stage] = stages[stage] or value
+
+    stmt = (select(UploadStatus)
+            .from_statement(UPDATE_UPLOAD_STATUS_MANY_SQL)
+            .execution_options(populate_existing=True))
+    result = session.scalars(stmt, {
+        "request_ids": list(merged),
+        **{stage: [stages[stage] for stages in merged.values()]
+        for stage in _STAGES},
+    }).all()
+    # Detached, so the commit does not expire them and reading them does 
+    # not reload every row
+    for status in result:
+        session.expunge(status)
+    session.commit()
+    return result
@@ -0,0 +1,82 @@
+import re
+import uuid
+
+import torch
+from pymongo.collection import Collection
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.crud.metadata import upsert_metadata_many
+from app.crud.paper import (
+    create_references,
+    paper_title_key,
+    resolve_reference_titles,
+    upsert_papers,
+)
+from app.models.metadata import Metadata
+
+
+def filter_columns(
+    published_year: str | None, impact: int | None, authors: list[str] | None
+) -> dict:
+    """
+    Returns the `paper` columns that searches filter on, copied from 
+    metadata fields. Years are parsed from free-form strings like 
+    "2020" or "2020-05-14".
+    """
+    year = re.search(r"\d{4}", published_year or "")
+    return {
+        "published_year": int(year.group()) if year else None,
+        "impact": impact,
+        "authors": authors,
+    }
+
+
+def ingest_papers(
+    session: Session,
+    collection: Collection,
+    documents: list[Metadata],
+    embeddings: torch.Tensor,
+    content_collection: Collection | None = None,
+) -> list[uuid.UUID]:
+    """
+    Stores many papers with set-based statements in a single PostgreSQL 
+    transaction, then writes their metadata to MongoDB in one bulk 
+    request. Papers and references are matched to existing papers by 
+    normalized title. Returns paper ids in the order of `documents`.
+    """
+    # Later documents win when titles repeat
+    papers = {
+        paper_title_key(d.title): (d, emb)
+    for d, emb in zip(documents, embeddings)}
+    model_name = utils.get_embedding_model().name
+    title_ids = upsert_papers(session, [{
+        "title": d.title,
+        "embedding": emb.numpy(),
+        "embedding_model": model_name,
+        **filter_columns(d.published_year, d.impact, d.authors),
+    } for d, emb in papers.values()])
+
+    # Resolve references against existing papers; raw titles are passed 
+    # so placeholders keep them
+    citations = {
+        (title, ref_title)
+    for title, (d, _) in papers.items()
+    for ref_title in d.reference if utils.normalize_text(ref_title)}
+    ref_ids = resolve_reference_titles(session, [
+        ref_title for _, ref_title in citations])
+    edges = {
+        (title_ids[src], ref_ids[utils.normalize_text(dst)])
+    for src, dst in citations}
+    create_references(session, sorted(
+        (src, dst) for src, dst in edges if src != dst))
+    session.commit()
+
+    # Create metadata
+    upsert_metadata_many(
+        collection,
+        {title_ids[title]: d for title, (d, _) in papers.items()},
+        content_collection,
+    )
+
+    return [title_ids[paper_title_key(d.title)] for d in documents]
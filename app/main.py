@@ -1,17 +1,73 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from sqlmodel import Session, text
 
 from app.api.main import api_router
 from app.core.config import settings
 from app.core.database import engine
+from app.core.executor import inference_executor
+from app.core.metrics import ServerTimingMiddleware, observe_sql_pool
+from app.core.vector_store import VectorStore, sync_vector_store
+from app.utils import (
+    get_vector_store,
+    refresh_citation_graph,
+    upload_status_listener,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+async def sync_vector_store_periodically(store: VectorStore) -> None:
+    while True:
+        try:
+            await run_in_threadpool(sync_vector_store, store)
+        except Exception:
+            logger.exception("Syncing the vector store failed")
+        await asyncio.sleep(settings.VECTOR_STORE_SYNC_INTERVAL)
+
+
+async def refresh_citation_graph_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.CITATION_GRAPH_REFRESH_INTERVAL)
+        try:
+            await run_in_threadpool(refresh_citation_graph)
+        except Exception:
+            logger.exception("Reloading the citation graph failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the vector store before serving the first search
+    store = await run_in_threadpool(get_vector_store)
+    sync_task = None
+    if settings.VECTOR_STORE == "memory":
+        sync_task = asyncio.create_task(sync_vector_store_periodically(store))
+    refresh_task = asyncio.create_task(refresh_citation_graph_periodically())
+    # One connection feeds every client of /upload/status/events
+    await upload_status_listener.start()
+
+    yield
+
+    if sync_task is not None:
+        sync_task.cancel()
+    refresh_task.cancel()
+    await upload_status_listener.stop()
+    inference_executor.shutdown(wait=False, cancel_futures=True)
 
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Set CORS enabled origins
@@ -20,7 +76,17 @@ if settings.BACKEND_CORS_ORIGINS:
         CORSMiddleware,
         allow_origins=settings.BACKEND_CORS_ORIGINS,
         allow_methods=["*"],
+        # Paginated upload status returns its cursor in a header
+        expose_headers=["X-Next-Cursor"],
     )
 
+app.add_middleware(ServerTimingMiddleware)
+
 # Configure routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    observe_sql_pool(engine)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,3 +1,4 @@
 from app.core.database import Base
+from app.models.job import IngestJob
 from app.models.paper import Paper
 from app.models.status import UploadStatus
\ No newline at end of file
@@ -0,0 +1,47 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class IngestJob(Base):
+    """
+    Paper waiting to be embedded and stored by an ingestion worker.
+
+    `run_at` is when the job may next be claimed: the retry time of a 
+    pending job, or the lease expiry of a running one.
+    """
+    __tablename__ = "ingest_job"
+    __table_args__ = (
+        # Workers only ever scan jobs that are not finished yet
+        Index(
+            "ix_ingest_job_run_at",
+            "run_at",
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    request_id: Mapped[int] = mapped_column(
+        ForeignKey("upload_status.request_id"))
+    payload: Mapped[dict] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(default="pending")
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[Optional[str]]
+    run_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "request_id": self.request_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+        }
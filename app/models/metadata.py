@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from app.models.schemas import PaperSummary
+
 
 class Body(BaseModel):
     paragraph_id: int
@@ -25,3 +27,14 @@ class Metadata(BaseModel):
     figures: list[Figure]
     tables: list[Figure]
     authors: list[str]
+
+
+class MetadataSummary(BaseModel):
+    """
+    Subset of `Metadata` needed to render search results
+    """
+    title: str
+    published_year: str | None = None
+    impact: int | None = None
+    authors: list[str] | None = None
+    summary: PaperSummary | None = None
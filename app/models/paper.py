@@ -1,10 +1,23 @@
+import datetime
 import uuid
 from typing import Optional
 
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import Table, Column, ForeignKey
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Table,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.config import settings
 from app.core.database import Base
 
 
@@ -12,17 +25,83 @@ association_table = Table(
     "references",
     Base.metadata,
     Column("paper_id", ForeignKey("paper.id"), primary_key=True),
-    Column("referencing_paper_id", ForeignKey("paper.id"), primary_key=True)
+    Column("referencing_paper_id", ForeignKey("paper.id"), primary_key=True),
+    # The primary key only covers lookups by paper_id
+    Index("ix_references_referencing_paper_id", "referencing_paper_id"),
 )
 
 
+def _embedding_index_params() -> dict:
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        return {"lists": settings.IVFFLAT_LISTS}
+    return {
+        "m": settings.HNSW_M,
+        "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+    }
+
+
 class Paper(Base):
     __tablename__ = "paper"
+    __table_args__ = (
+        Index(
+            "ix_paper_embedding",
+            "embedding",
+            postgresql_using=settings.VECTOR_INDEX_TYPE,
+            postgresql_with=_embedding_index_params(),
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index(
+            "ix_paper_embedding_half",
+            "embedding_half",
+            postgresql_using=settings.VECTOR_INDEX_TYPE,
+            postgresql_with=_embedding_index_params(),
+            postgresql_ops={"embedding_half": "halfvec_cosine_ops"},
+        ),
+        Index(
+            "ix_paper_embedding_bit",
+            "embedding_bit",
+            postgresql_using=settings.VECTOR_INDEX_TYPE,
+            postgresql_with=_embedding_index_params(),
+            postgresql_ops={"embedding_bit": "bit_hamming_ops"},
+        ),
+        # Titles normalizing to "" cannot be matched and are not unique
+        Index(
+            "uq_paper_normalized_title",
+            "normalized_title",
+            unique=True,
+            postgresql_where=text("normalized_title <> ''"),
+        ),
+        Index("ix_paper_updated_at", "updated_at"),
+        Index("ix_paper_embedding_model", "embedding_model"),
+        Index("ix_paper_published_year", "published_year"),
+        Index("ix_paper_impact", "impact"),
+        Index("ix_paper_authors", "authors", postgresql_using="gin"),
+        Index("ix_paper_pagerank", "pagerank"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     title: Mapped[Optional[str]]
     normalized_title: Mapped[str]
     embedding: Mapped[Optional[Vector]] = mapped_column(Vector(768))
+    # Name of the `Embedding` that computed `embedding`
+    embedding_model: Mapped[Optional[str]]
+    # Compact copies of `embedding` for candidate search, generated by 
+    # PostgreSQL; deferred so only search queries read them
+    embedding_half: Mapped[Optional[HALFVEC]] = mapped_column(
+        HALFVEC(768), Computed("embedding::halfvec(768)"), deferred=True)
+    embedding_bit: Mapped[Optional[BIT]] = mapped_column(
+        BIT(768), Computed("binary_quantize(embedding)::bit(768)"), deferred=True)
+    # Lets in-process vector stores pick up new and changed embeddings
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Copies of `Metadata` fields that vector searches filter on
+    published_year: Mapped[Optional[int]]
+    impact: Mapped[Optional[int]]
+    authors: Mapped[Optional[list[str]]] = mapped_column(ARRAY(String))
+    # Citation centrality computed by app.scripts.pagerank; PageRank is 
+    # scaled so the average paper scores 1
+    pagerank: Mapped[Optional[float]]
+    in_degree: Mapped[Optional[int]]
     references: Mapped[list["Paper"]] = relationship(
         "Paper",
         secondary=association_table,
@@ -1,6 +1,7 @@
 import uuid
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # =========================================================
@@ -11,13 +12,39 @@ class PaperBase(BaseModel):
     title: str | None = None
 
 
-class PaperQuery(BaseModel):
+class PaperText(BaseModel):
     domain: str
     problem: str | None = None
     solution: str | None = None
 
 
-class PaperSummary(PaperQuery):
+class PaperFilter(BaseModel):
+    # Inclusive bounds on the publication year
+    year_from: int | None = None
+    year_to: int | None = None
+    min_impact: int | None = None
+    # Papers by any of these authors, matched by exact name
+    authors: list[str] | None = Field(default=None, min_length=1)
+
+
+class PaperQuery(PaperText):
+    # Per-request ANN recall/latency knobs; server defaults when omitted
+    ef_search: int | None = Field(default=None, ge=1, le=1000)
+    probes: int | None = Field(default=None, ge=1, le=1000)
+    filters: PaperFilter | None = None
+    # Share of the ranking given to citation centrality instead of 
+    # similarity; CENTRALITY_WEIGHT when omitted
+    centrality_weight: float | None = Field(default=None, ge=0, le=1)
+
+    def texts(self) -> dict:
+        """
+        Text fields fed to the query embedding model.
+        """
+        return self.model_dump(
+            include=set(PaperText.model_fields), exclude_none=True)
+
+
+class PaperSummary(PaperText):
     keywords: list[str]
 
 
@@ -30,12 +57,31 @@ class PaperQueryResponse(PaperBase):
 
 class PaperGraphRequest(BaseModel):
     num_nodes: int
-    root_id: str
+    root_id: uuid.UUID
     query: PaperQuery
+    # Hops to expand from the root, keeping `beam_width` nodes per hop 
+    # (`num_nodes` when omitted); at most `num_nodes` nodes are returned, 
+    # shallowest first
+    depth: int = Field(default=1, ge=1, le=5)
+    beam_width: int | None = Field(default=None, ge=1, le=100)
 
 
 class PaperGraphResponse(PaperQueryResponse):
     score: float
+    depth: int = 1
+    # The node this one was reached from; (parent_id, id) is the edge
+    parent_id: uuid.UUID | None = None
+
+
+class PaperRelatedResponse(PaperQueryResponse):
+    # Personalized PageRank from the hits of the query
+    score: float
+
+
+class PaperPathResponse(PaperQueryResponse):
+    # Whether this paper cites the next one on the path, rather than 
+    # being cited by it; None for the last paper
+    cites_next: bool | None = None
 
 
 # =========================================================
@@ -52,3 +98,34 @@ class UploadStatusSchema(BaseModel):
 
 class UploadStatusCreate(BaseModel):
     filename: str
+
+
+class UploadStatusUpdate(BaseModel):
+    """
+    Stages of an upload to change; stages left unset keep their value
+    """
+    request_id: int
+    pdf_upload: bool | None = None
+    document_layout: bool | None = None
+    reading_order: bool | None = None
+    db_loaded: bool | None = None
+
+
+# Processing stages of an upload, in order
+UploadStage = Literal["pdf_upload", "document_layout", "reading_order", "db_loaded"]
+
+
+# =========================================================
+# Ingest Job
+# =========================================================
+class IngestJobAccepted(BaseModel):
+    request_id: int
+    job_id: int
+
+
+class IngestJobSchema(BaseModel):
+    id: int
+    request_id: int
+    status: str
+    attempts: int
+    last_error: str | None = None
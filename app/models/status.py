@@ -1,10 +1,27 @@
+from typing import get_args
+
+from sqlalchemy import Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
+from app.models.schemas import UploadStage
 
 
 class UploadStatus(Base):
     __tablename__ = "upload_status"
+    __table_args__ = (
+        # Pages of one filename in request_id order
+        Index("ix_upload_status_filename", "filename", "request_id"),
+        # Pages of uploads stuck before a stage; finished uploads, the 
+        # vast majority, are left out of these indexes
+        *[
+            Index(
+                f"ix_upload_status_pending_{stage}",
+                "request_id",
+                postgresql_where=text(f"NOT {stage}"),
+            )
+        for stage in get_args(UploadStage)],
+    )
 
     request_id: Mapped[int] = mapped_column(primary_key=True)
     filename: Mapped[str]
@@ -0,0 +1,57 @@
+"""
+Copies the filterable metadata fields from MongoDB into `paper` columns.
+
+Papers ingested before the filter columns existed have no published year,
+impact or authors in PostgreSQL, so filtered searches skip them until
+this runs. New uploads fill the columns themselves; re-running is safe.
+
+    python -m app.scripts.backfill_paper_filters --chunk-size 1000
+"""
+import argparse
+import logging
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.core.database import collection, engine
+from app.ingest import filter_columns
+from app.models.paper import Paper
+
+
+logger = logging.getLogger(__name__)
+
+# Keeps `updated_at` so vector stores do not re-sync unchanged embeddings
+UPDATE_FILTERS = (update(Paper.__table__)
+                  .where(Paper.__table__.c.id == bindparam("paper_id"))
+                  .values(
+                      published_year=bindparam("published_year"),
+                      impact=bindparam("impact"),
+                      authors=bindparam("authors"),
+                      updated_at=Paper.__table__.c.updated_at,
+                  ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    projection = {"published_year": True, "impact": True, "authors": True}
+    cursor = collection.find({}, projection).batch_size(args.chunk_size)
+    done = 0
+    with Session(engine) as session:
+        for chunk in utils.chunked(cursor, args.chunk_size):
+            session.execute(UPDATE_FILTERS, [
+                {"paper_id": doc["_id"]} | filter_columns(
+                    doc.get("published_year"), doc.get("impact"), doc.get("authors"))
+            for doc in chunk])
+            session.commit()
+            utils.response_cache.bump_version()
+            done += len(chunk)
+            logger.info("Backfilled %d papers", done)
+
+
+if __name__ == "__main__":
+    main()
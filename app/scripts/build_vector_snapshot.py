@@ -0,0 +1,119 @@
+"""
+Builds the snapshot loaded by `MemoryVectorStore` from PostgreSQL.
+
+Embeddings are streamed into a temporary memory-mapped matrix, so the
+corpus never has to fit in RAM. With --lists, rows are grouped into IVF
+lists by k-means for approximate search.
+
+    python -m app.scripts.build_vector_snapshot --dtype float16 --lists 1024
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.vector_store import DIMENSIONS, SCORE_CHUNK_ROWS, normalize
+from app.models.paper import Paper
+
+
+def write_snapshot(
+    directory: str,
+    ids: list[uuid.UUID],
+    embeddings: np.ndarray,
+    watermark: datetime.datetime | None,
+    model: str,
+    dtype: str = "float32",
+    lists: int = 0,
+) -> None:
+    """
+    Writes a snapshot of `embeddings` computed by `model`, normalized and stored as `dtype`.
+    With positive `lists`, rows are ordered by IVF list so each list is
+    one contiguous slice. The snapshot is written next to `directory`
+    and then moved into place; processes still mapping the old snapshot
+    keep reading its unlinked files.
+    """
+    path = pathlib.Path(directory)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    order = np.arange(len(ids))
+    if lists > 0:
+        kmeans = MiniBatchKMeans(n_clusters=lists, n_init=1, batch_size=4096)
+        sample = np.random.default_rng(0).choice(
+            len(ids), size=min(len(ids), 256 * lists), replace=False)
+        kmeans.fit(normalize(np.asarray(embeddings[np.sort(sample)])))
+        assignments = np.concatenate([
+            kmeans.predict(normalize(np.asarray(embeddings[i:i + SCORE_CHUNK_ROWS])))
+        for i in range(0, len(ids), SCORE_CHUNK_ROWS)])
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(lists + 1))
+        np.save(tmp / "centroids.npy", normalize(kmeans.cluster_centers_))
+        np.save(tmp / "offsets.npy", offsets)
+
+    id_array = np.array([id.bytes for id in ids], dtype="S16")
+    np.save(tmp / "ids.npy", id_array[order])
+    out = np.lib.format.open_memmap(
+        tmp / "embeddings.npy", mode="w+", dtype=dtype,
+        shape=(len(ids), DIMENSIONS))
+    for i in range(0, len(ids), SCORE_CHUNK_ROWS):
+        rows = order[i:i + SCORE_CHUNK_ROWS]
+        out[i:i + len(rows)] = normalize(np.asarray(embeddings[rows]))
+    out.flush()
+    del out
+
+    (tmp / "meta.json").write_text(json.dumps({
+        "count": len(ids),
+        "dtype": dtype,
+        "lists": lists,
+        "model": model,
+        "watermark": watermark.isoformat() if watermark else None,
+    }))
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.rename(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--directory", default=settings.VECTOR_SNAPSHOT_DIR)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float16")
+    parser.add_argument("--lists", type=int, default=0)
+    args = parser.parse_args()
+
+    with Session(engine) as session, tempfile.TemporaryDirectory() as tmp:
+        # One snapshot of the table for the count and the rows
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        model = settings.EMBEDDING_MODEL.name
+        count = session.scalar(
+            select(func.count(Paper.id)).where(Paper.embedding_model == model))
+        embeddings = np.lib.format.open_memmap(
+            pathlib.Path(tmp) / "embeddings.npy", mode="w+", dtype=np.float32,
+            shape=(count, DIMENSIONS))
+
+        ids, watermark = [], None
+        stmt = (select(Paper.id, Paper.embedding, Paper.updated_at)
+                .where(Paper.embedding_model == model)
+                .execution_options(yield_per=1000))
+        for i, (id, embedding, updated_at) in enumerate(session.execute(stmt)):
+            ids.append(id)
+            embeddings[i] = embedding
+            watermark = max(watermark or updated_at, updated_at)
+
+        write_snapshot(
+            args.directory, ids, embeddings, watermark, model, args.dtype,
+            args.lists)
+        print(f"Wrote {len(ids)} embeddings to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
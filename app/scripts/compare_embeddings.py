@@ -0,0 +1,107 @@
+"""
+Compares `Specter2Onnx` against the fp32 PyTorch `Specter2`.
+
+Embeds a sample of stored papers, and queries built from their summaries,
+with both models. Reports the cosine similarity of paired embeddings and
+the overlap of exact top-k retrieval over the sample. Exits non-zero if
+any pair falls below the tolerance of the ONNX model.
+
+    python -m app.scripts.compare_embeddings --limit 1000 --k 10 --quantize
+"""
+import argparse
+import sys
+
+import torch
+
+from app.core.config import settings
+from app.core.database import collection
+from app.core.embedding import Specter2, Specter2Onnx
+from app.utils import chunked
+
+
+# Minimum cosine similarity to the fp32 PyTorch embedding
+FP32_TOLERANCE = 0.9999
+INT8_TOLERANCE = 0.99
+
+
+def load_sample(limit: int) -> tuple[list[dict], list[dict]]:
+    papers, queries = [], []
+    projection = {"title": True, "abstract": True, "summary": True}
+    for doc in collection.find({}, projection).limit(limit):
+        papers.append({"title": doc["title"], "abstract": doc["abstract"]})
+        summary = doc.get("summary") or {"domain": doc["title"]}
+        queries.append({
+            k: summary[k]
+        for k in ("domain", "problem", "solution") if summary.get(k)})
+    return papers, queries
+
+
+def embed(fn, texts: list[dict], batch_size: int) -> torch.Tensor:
+    return torch.cat([fn(batch) for batch in chunked(texts, batch_size)])
+
+
+def retrieval_overlap(
+    expected_q: torch.Tensor,
+    expected: torch.Tensor,
+    actual_q: torch.Tensor,
+    actual: torch.Tensor,
+    k: int,
+) -> float:
+    """
+    Mean fraction of the exact top-k of each expected query that is also
+    in the top-k of the same actual query.
+    """
+    def top_k(q: torch.Tensor, corpus: torch.Tensor) -> torch.Tensor:
+        q = torch.nn.functional.normalize(q, dim=1)
+        corpus = torch.nn.functional.normalize(corpus, dim=1)
+        return (q @ corpus.T).topk(min(k, len(corpus)), dim=1).indices
+
+    expected_ids = top_k(expected_q, expected)
+    actual_ids = top_k(actual_q, actual)
+    overlaps = [
+        len(set(e.tolist()) & set(a.tolist())) / len(e)
+    for e, a in zip(expected_ids, actual_ids)]
+    return sum(overlaps) / len(overlaps)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantize", action="store_true")
+    args = parser.parse_args()
+
+    papers, queries = load_sample(args.limit)
+    if not papers:
+        sys.exit("No papers to compare")
+
+    reference = settings.EMBEDDING_MODEL
+    if not isinstance(reference, Specter2):
+        reference = Specter2()
+    candidate = Specter2Onnx(
+        model_dir=settings.ONNX_MODEL_DIR,
+        quantize=args.quantize,
+        intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+    )
+
+    expected = embed(reference.encode_batch, papers, args.batch_size)
+    actual = embed(candidate.encode_batch, papers, args.batch_size)
+    expected_q = embed(reference.encode_query_batch, queries, args.batch_size)
+    actual_q = embed(candidate.encode_query_batch, queries, args.batch_size)
+
+    tolerance = INT8_TOLERANCE if args.quantize else FP32_TOLERANCE
+    cos = torch.nn.functional.cosine_similarity(
+        torch.cat([expected, expected_q]), torch.cat([actual, actual_q]))
+    overlap = retrieval_overlap(expected_q, expected, actual_q, actual, args.k)
+
+    print(f"papers: {len(papers)}, queries: {len(queries)}")
+    print(f"cosine similarity: min {cos.min():.6f}, mean {cos.mean():.6f}")
+    print(f"max abs difference: {(expected - actual).abs().max():.6f}")
+    print(f"top-{args.k} retrieval overlap: {overlap:.4f}")
+    if cos.min() < tolerance:
+        sys.exit(f"Minimum cosine similarity is below {tolerance}")
+
+
+if __name__ == "__main__":
+    main()
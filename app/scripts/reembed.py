@@ -0,0 +1,143 @@
+"""
+Re-embeds stored papers with the configured EMBEDDING_MODEL.
+
+Papers are read in pages ordered by id (keyset pagination), each page
+through a server-side cursor, and embedded from their title and their
+abstract in MongoDB. Each chunk is sorted by text length so batches need
+little padding, and is written back with one bulk UPDATE. Progress is
+checkpointed after every chunk, so an interrupted run resumes where it
+stopped. Papers already embedded by the current model are skipped
+unless --all is given.
+
+    python -m app.scripts.reembed --chunk-size 512 --batch-size 32
+"""
+import argparse
+import json
+import logging
+import os
+import pathlib
+import uuid
+
+import torch
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.core.config import settings
+from app.core.database import collection, engine
+from app.core.embedding import Embedding
+from app.crud.metadata import get_abstracts_by_ids
+from app.crud.paper import update_embeddings
+from app.models.paper import Paper
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(path: pathlib.Path, model_name: str) -> tuple[uuid.UUID | None, int]:
+    """
+    Returns the last re-embedded id and the count so far, unless the
+    checkpoint belongs to another model.
+    """
+    if not path.exists():
+        return None, 0
+    checkpoint = json.loads(path.read_text())
+    if checkpoint["model"] != model_name:
+        return None, 0
+    return uuid.UUID(checkpoint["last_id"]), checkpoint["done"]
+
+
+def save_checkpoint(
+    path: pathlib.Path, model_name: str, last_id: uuid.UUID, done: int
+) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({
+        "model": model_name,
+        "last_id": str(last_id),
+        "done": done,
+    }))
+    os.replace(tmp, path)
+
+
+def reembed_chunk(
+    session: Session,
+    rows: list[tuple[uuid.UUID, str]],
+    model: Embedding,
+    batch_size: int,
+) -> None:
+    abstracts = get_abstracts_by_ids(collection, [id for id, _ in rows])
+    papers = []
+    for id, title in rows:
+        texts = {'title': title or ''}
+        if id in abstracts:
+            texts['abstract'] = abstracts[id]
+        papers.append((id, texts))
+
+    # Similar lengths in a batch keep padding short
+    papers.sort(key=lambda paper: sum(map(len, paper[1].values())))
+    embeddings = torch.cat([
+        model.encode_batch([texts for _, texts in batch])
+    for batch in utils.chunked(papers, batch_size)])
+
+    update_embeddings(session, [id for id, _ in papers], embeddings, model.name)
+    session.commit()
+    utils.response_cache.bump_version()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--page-size", type=int, default=50_000)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.INGEST_EMBED_BATCH_SIZE)
+    parser.add_argument(
+        "--checkpoint", type=pathlib.Path,
+        default=pathlib.Path("reembed.checkpoint.json"))
+    parser.add_argument(
+        "--all", action="store_true",
+        help="also re-embed papers already embedded by the current model")
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    model = utils.get_embedding_model()
+    last_id, done = None, 0
+    if not args.restart:
+        last_id, done = load_checkpoint(args.checkpoint, model.name)
+    if last_id is not None:
+        logger.info("Resuming after %s with %d papers done", last_id, done)
+
+    with Session(engine) as read_session, Session(engine) as write_session:
+        while True:
+            stmt = (select(Paper.id, Paper.title)
+                    .where(Paper.embedding != None)
+                    .order_by(Paper.id)
+                    .limit(args.page_size))
+            if not args.all:
+                stmt = stmt.where(
+                    Paper.embedding_model.is_distinct_from(model.name))
+            if last_id is not None:
+                stmt = stmt.where(Paper.id > last_id)
+
+            # A new transaction per page keeps read snapshots short-lived
+            result = read_session.execute(
+                stmt.execution_options(yield_per=args.chunk_size))
+            page = 0
+            for chunk in result.partitions():
+                reembed_chunk(write_session, chunk, model, args.batch_size)
+                last_id = chunk[-1][0]
+                page += len(chunk)
+                done += len(chunk)
+                save_checkpoint(args.checkpoint, model.name, last_id, done)
+                logger.info("Re-embedded %d papers", done)
+            read_session.commit()
+
+            if page < args.page_size:
+                break
+
+    logger.info("Done: %d papers embedded by %s", done, model.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,64 @@
 import re
+import threading
+import uuid
+from itertools import islice
+from typing import Iterable, Iterator, TypeVar
 
 import torch
+from sqlalchemy.orm import Session
 
+from app.core.batching import BatchingEmbedding
+from app.core.cache import (
+    LRUCache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+)
 from app.core.config import settings
+from app.core.database import engine
+from app.core.embedding import Embedding
+from app.core.graph import CitationGraph, load_citation_graph
+from app.core.metrics import timed
+from app.core.notifications import NotificationListener
+from app.core.vector_store import (
+    MemoryVectorStore,
+    PostgresVectorStore,
+    VectorStore,
+)
+from app.crud.status import UPLOAD_STATUS_CHANNEL
+
+
+T = TypeVar("T")
+
+_batching_model: BatchingEmbedding | None = None
+_batching_lock = threading.Lock()
+
+_vector_store: VectorStore | None = None
+_vector_store_lock = threading.Lock()
+
+_citation_graph: CitationGraph | None = None
+_citation_graph_lock = threading.Lock()
+
+query_embedding_cache = LRUCache(
+    maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl=settings.QUERY_EMBEDDING_CACHE_TTL,
+)
+
+
+def _create_response_cache() -> ResponseCache:
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        import redis
+        backend = RedisCacheBackend(redis.Redis.from_url(settings.REDIS_URL))
+    else:
+        backend = MemoryCacheBackend(settings.RESPONSE_CACHE_SIZE, engine)
+    return ResponseCache(backend, ttl=settings.RESPONSE_CACHE_TTL)
+
+
+response_cache = _create_response_cache()
+
+# Started by the app's lifespan
+upload_status_listener = NotificationListener(
+    UPLOAD_STATUS_CHANNEL, settings.STATUS_EVENTS_QUEUE_SIZE)
 
 
 def cosine_similarity(a: torch.Tensor, b: torch.Tensor) -> float:
@@ -13,20 +69,131 @@ def cosine_similarity(a: torch.Tensor, b: torch.Tensor) -> float:
     return cos(a, b).item()
 
 
+def get_embedding_model() -> Embedding:
+    """
+    Returns the configured embedding model, wrapped in a micro-batching 
+    layer unless batching is disabled.
+    """
+    global _batching_model
+
+    model = settings.EMBEDDING_MODEL
+    if settings.EMBEDDING_MAX_BATCH_SIZE <= 1:
+        return model
+
+    with _batching_lock:
+        if _batching_model is None or _batching_model.model is not model:
+            _batching_model = BatchingEmbedding(
+                model,
+                max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+                max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+            )
+        return _batching_model
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Returns the configured vector store, loading it on first use.
+    """
+    global _vector_store
+
+    with _vector_store_lock:
+        if _vector_store is None:
+            if settings.VECTOR_STORE == "memory":
+                _vector_store = MemoryVectorStore(settings.VECTOR_SNAPSHOT_DIR)
+            else:
+                _vector_store = PostgresVectorStore()
+        return _vector_store
+
+
+def get_citation_graph() -> CitationGraph:
+    """
+    Returns the in-memory citation graph, loading it on first use.
+    """
+    global _citation_graph
+
+    with _citation_graph_lock:
+        if _citation_graph is None:
+            _citation_graph = load_citation_graph()
+        return _citation_graph
+
+
+def refresh_citation_graph() -> None:
+    """
+    Reloads the citation graph if it was loaded, picking up citations
+    stored by other processes such as the ingestion workers.
+    """
+    global _citation_graph
+
+    if _citation_graph is None:
+        return
+    graph = load_citation_graph()
+    with _citation_graph_lock:
+        _citation_graph = graph
+
+
+def add_citations(session: Session, ids: list[uuid.UUID]) -> None:
+    """
+    Adds the stored citations of new papers to the citation graph, if 
+    it was loaded.
+    """
+    graph = _citation_graph
+    if graph is not None:
+        graph.add_papers(session, ids)
+
+
+@timed("embed")
 def create_embedding(d: dict) -> torch.Tensor:
     """
     Creates an embedding from a dictionary using the configured 
     embedding model.
     """
-    return settings.EMBEDDING_MODEL.encode(d)
+    return get_embedding_model().encode(d)
 
 
+@timed("embed")
+def create_embeddings(ds: list[dict], batch_size: int) -> torch.Tensor:
+    """
+    Creates embeddings for many dictionaries, running the model on 
+    batches of at most `batch_size` inputs.
+    """
+    model = get_embedding_model()
+    return torch.cat([
+        model.encode_batch(list(batch))
+    for batch in chunked(ds, batch_size)])
+
+
+@timed("embed_query")
 def create_query_embedding(d: dict) -> torch.Tensor:
     """
     Creates a query embedding from a dictionary using the configured 
-    embedding model.
+    embedding model. The canonical form of the query is both encoded and 
+    cached by, with the model name, so queries sharing a cache entry get 
+    the same embedding and switching models never serves stale ones.
+    """
+    model = get_embedding_model()
+    query = canonicalize_query(d)
+    key = (model.name, tuple(query.items()))
+
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        # Batched encodes return rows of the batch output; a copy keeps 
+        # the cache from holding whole batches
+        embedding = model.encode_query(query).clone()
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+def canonicalize_query(d: dict) -> dict:
+    """
+    Canonicalizes query texts by collapsing whitespace and dropping empty 
+    fields. Unlike `normalize_text`, case, punctuation and word 
+    boundaries are kept since cased tokenizers rely on them.
     """
-    return settings.EMBEDDING_MODEL.encode_query(d)
+    return {
+        k: " ".join(d[k].split())
+        for k in d
+        if d[k] and d[k].strip()
+    }
 
 
 def normalize_text(s: str) -> str:
@@ -37,3 +204,12 @@ def normalize_text(s: str) -> str:
     s = s.strip()
     s = re.sub(r'[^a-zA-Z0-9]', '', s).lower()
     return s
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[tuple[T, ...]]:
+    """
+    Splits an iterable into tuples of at most `size` items.
+    """
+    it = iter(items)
+    while chunk := tuple(islice(it, size)):
+        yield chunk
@@ -0,0 +1,94 @@
+"""
+Pool of ingestion worker processes draining the `ingest_job` queue.
+
+Run with `python -m app.worker`; INGEST_WORKERS sets the pool size.
+"""
+import logging
+import multiprocessing
+import signal
+from multiprocessing.synchronize import Event
+
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.core.config import settings
+from app.core.database import collection, content_collection, engine
+from app.crud.job import claim_ingest_jobs, complete_ingest_jobs, fail_ingest_job
+from app.ingest import ingest_papers
+from app.models.job import IngestJob
+from app.models.metadata import Metadata
+
+
+logger = logging.getLogger(__name__)
+
+
+def process_ingest_jobs(session: Session, jobs: list[IngestJob]) -> None:
+    """
+    Embeds and stores claimed jobs as one batch. If the batch fails, its 
+    jobs are retried one at a time so a bad paper only fails itself.
+    """
+    try:
+        documents = [Metadata.model_validate(job.payload) for job in jobs]
+        texts = [{'title': d.title, 'abstract': d.abstract} for d in documents]
+        embeddings = utils.create_embeddings(
+            texts, settings.INGEST_EMBED_BATCH_SIZE)
+        ingest_papers(
+            session, collection, documents, embeddings, content_collection)
+    except Exception as e:
+        session.rollback()
+        if len(jobs) > 1:
+            logger.warning("Ingest batch of %d jobs failed, retrying each", len(jobs))
+            for job in jobs:
+                process_ingest_jobs(session, [job])
+        else:
+            logger.exception("Ingest job %d failed", jobs[0].id)
+            fail_ingest_job(session, jobs[0], repr(e))
+        return
+
+    complete_ingest_jobs(session, jobs)
+
+
+def run_worker(stop: Event) -> None:
+    """
+    Claims and processes job batches until `stop` is set.
+    """
+    # Jobs are read after the commit that claims them
+    with Session(engine, expire_on_commit=False) as session:
+        while not stop.is_set():
+            jobs = claim_ingest_jobs(
+                session, settings.INGEST_JOB_BATCH_SIZE, settings.INGEST_JOB_LEASE)
+            if not jobs:
+                stop.wait(settings.INGEST_POLL_INTERVAL)
+                continue
+            process_ingest_jobs(session, jobs)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    # Spawned workers open their own database connections and model
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+
+    # Workers inherit ignored signals and only stop through `stop`, so a 
+    # Ctrl-C or SIGTERM to the process group lets current batches finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    workers = [
+        context.Process(target=run_worker, args=(stop,), name=f"ingest-{i}")
+    for i in range(settings.INGEST_WORKERS)]
+    for worker in workers:
+        worker.start()
+
+    def shutdown(signum, frame):
+        logger.info("Stopping ingestion workers")
+        stop.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Compares two result files of `benchmarks.run`.
+
+Prints the relative change of p50 and p95 latency and of throughput of
+each operation and corpus size found in both runs.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import pathlib
+
+
+def load_operations(path: pathlib.Path) -> dict[tuple[int, str], dict]:
+    results = json.loads(path.read_text())
+    return {
+        (run["size"], name): stats
+    for run in results["runs"] for name, stats in run["operations"].items()}
+
+
+def change(old: float, new: float) -> str:
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old", type=pathlib.Path)
+    parser.add_argument("new", type=pathlib.Path)
+    args = parser.parse_args()
+
+    old, new = load_operations(args.old), load_operations(args.new)
+    print(f"{'size':>8}  {'operation':<20} {'p50':>9} {'p95':>9} {'throughput':>11}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        print(f"{key[0]:>8}  {key[1]:<20} "
+              f"{change(a['p50_ms'], b['p50_ms']):>9} "
+              f"{change(a['p95_ms'], b['p95_ms']):>9} "
+              f"{change(a['throughput'], b['throughput']):>11}")
+
+
+if __name__ == "__main__":
+    main()
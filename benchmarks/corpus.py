@@ -0,0 +1,126 @@
+import uuid
+from typing import Literal
+
+import numpy as np
+import torch
+
+from app.core.embedding import Embedding
+from app.models.metadata import Metadata
+
+
+DIMENSIONS = 768
+
+DegreeDistribution = Literal["fixed", "poisson", "zipf"]
+
+WORDS = (
+    "graph neural network transformer attention retrieval embedding "
+    "language model vision contrastive learning sparse dense index "
+    "citation quantization latency inference benchmark protein molecule "
+    "reinforcement policy diffusion generative robust causal"
+).split()
+
+
+class Corpus:
+    """
+    Synthetic papers with metadata, embeddings and citations
+    """
+
+    def __init__(
+        self,
+        ids: list[uuid.UUID],
+        documents: list[Metadata],
+        embeddings: np.ndarray,
+        edges: list[tuple[uuid.UUID, uuid.UUID]],
+    ):
+        self.ids = ids
+        self.documents = documents
+        self.embeddings = embeddings
+        self.edges = edges
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def random_text(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words))
+
+
+def citation_degrees(
+    rng: np.random.Generator,
+    n: int,
+    distribution: DegreeDistribution,
+    mean_degree: float,
+) -> np.ndarray:
+    """
+    Samples the number of references of each of `n` papers.
+    """
+    if distribution == "fixed":
+        degrees = np.full(n, round(mean_degree))
+    elif distribution == "poisson":
+        degrees = rng.poisson(mean_degree, size=n)
+    else:
+        # Heavy-tailed, scaled so the mean stays near `mean_degree`
+        raw = rng.zipf(2.5, size=n).astype(np.float64)
+        degrees = np.round(raw * mean_degree / raw.mean())
+    return np.minimum(degrees, n - 1).astype(np.int64)
+
+
+def generate_corpus(
+    n: int,
+    mean_degree: float = 10.0,
+    distribution: DegreeDistribution = "poisson",
+    seed: int = 0,
+) -> Corpus:
+    """
+    Generates `n` papers with random unit embeddings, and citations to
+    uniformly random other papers with out-degrees from `distribution`.
+    """
+    rng = np.random.default_rng(seed)
+    ids = [uuid.UUID(bytes=rng.bytes(16), version=4) for _ in range(n)]
+    titles = [f"{random_text(rng, 6)} {i}" for i in range(n)]
+
+    embeddings = rng.standard_normal((n, DIMENSIONS)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    edges = []
+    for src, degree in enumerate(citation_degrees(rng, n, distribution, mean_degree)):
+        targets = rng.choice(n - 1, size=degree, replace=False)
+        # Skip the paper itself
+        targets[targets >= src] += 1
+        edges += [(ids[src], ids[dst]) for dst in targets]
+
+    documents = [
+        Metadata(
+            title=title,
+            abstract=random_text(rng, 150),
+            body=[],
+            impact=int(rng.integers(0, 1000)),
+            published_year=str(rng.integers(1990, 2025)),
+            reference=[],
+            figures=[],
+            tables=[],
+            authors=[random_text(rng, 2) for _ in range(3)],
+        )
+    for title in titles]
+    return Corpus(ids, documents, embeddings, edges)
+
+
+class FakeEmbedding(Embedding):
+    """
+    Deterministic stand-in for a real model: each text maps to a fixed
+    random unit vector, at the cost of a hash
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        pass
+
+    def encode(self, text: dict) -> torch.Tensor:
+        key = "\x1f".join(f"{k}={v}" for k, v in sorted(text.items()))
+        seed = int.from_bytes(uuid.uuid5(uuid.NAMESPACE_OID, key).bytes[:8], "big")
+        emb = np.random.default_rng(seed).standard_normal(DIMENSIONS)
+        return torch.from_numpy((emb / np.linalg.norm(emb)).astype(np.float32))
+
+    def encode_query(self, text: dict) -> torch.Tensor:
+        return self.encode(text)
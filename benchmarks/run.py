@@ -0,0 +1,295 @@
+"""
+Benchmarks the search and ingest hot paths on synthetic corpora.
+
+For each corpus size, a corpus is generated and loaded into its own
+PostgreSQL schema and MongoDB collection, then every operation runs
+sequentially, each iteration in a fresh session as a request would.
+Reports throughput and p50/p95/p99 latency per operation and writes
+them to a JSON file for `benchmarks.compare`.
+
+Embeddings come from a deterministic fake model unless --real-model is
+given. Micro-batching is disabled, since single-threaded callers would
+only wait out its batching window. With VECTOR_STORE=memory, searches
+run on a snapshot of each benchmark corpus. Writes bump the version of
+a response cache private to the run, never that of the deployment.
+
+    python -m benchmarks.run --sizes 1000 10000 --iterations 200
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import subprocess
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import Engine, create_engine, insert, text
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.core.cache import MemoryCacheBackend, ResponseCache
+from app.core.config import settings
+from app.core.database import Base, client
+from app.core.vector_store import MemoryVectorStore, PostgresVectorStore
+from app.crud.metadata import get_metadata_summaries_by_ids, upsert_metadata_many
+from app.crud.paper import (
+    create_paper,
+    create_references,
+    expand_references,
+    get_papers_by_similarity,
+    get_references_by_id,
+    get_similar_references,
+)
+from app.ingest import filter_columns
+from app.models.paper import Paper
+from app.scripts.build_vector_snapshot import write_snapshot
+from benchmarks.corpus import Corpus, FakeEmbedding, generate_corpus, random_text
+
+
+SCHEMA = "benchmark"
+# Built after loading, which is much faster than maintaining them per row
+VECTOR_INDEXES = [
+    index for index in Paper.__table__.indexes
+    if index.name.startswith("ix_paper_embedding")]
+
+
+def create_benchmark_engine() -> Engine:
+    # pgvector types live in the public schema
+    return create_engine(
+        str(settings.SQLALCHEMY_DATABSE_URI),
+        connect_args={"options": f"-csearch_path={SCHEMA},public"},
+    )
+
+
+def load_corpus(engine: Engine, collection, corpus: Corpus) -> dict:
+    """
+    Recreates the benchmark schema and collection with the corpus.
+    Returns the seconds spent loading rows and building vector indexes.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    # Without checkfirst, the tables of the public schema, which are on 
+    # the search path too, are not mistaken for the benchmark ones
+    Base.metadata.create_all(engine, checkfirst=False)
+    for index in VECTOR_INDEXES:
+        index.drop(engine)
+    collection.drop()
+
+    start = time.perf_counter()
+    model_name = utils.get_embedding_model().name
+    with Session(engine) as session:
+        for chunk in utils.chunked(range(len(corpus)), 1000):
+            session.execute(insert(Paper), [{
+                "id": corpus.ids[i],
+                "title": corpus.documents[i].title,
+                "normalized_title": utils.normalize_text(corpus.documents[i].title),
+                "embedding": corpus.embeddings[i],
+                "embedding_model": model_name,
+                **filter_columns(
+                    corpus.documents[i].published_year,
+                    corpus.documents[i].impact,
+                    corpus.documents[i].authors),
+            } for i in chunk])
+        create_references(session, corpus.edges)
+        session.commit()
+    upsert_metadata_many(collection, dict(zip(corpus.ids, corpus.documents)))
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in VECTOR_INDEXES:
+        index.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE paper, "references"'))
+    return {
+        "load_seconds": load_seconds,
+        "index_seconds": time.perf_counter() - start,
+    }
+
+
+def load_vector_store(corpus: Corpus, directory: str, dtype: str, lists: int) -> dict:
+    """
+    Makes searches use a vector store of the corpus: a memory store 
+    over a snapshot in `directory` with VECTOR_STORE=memory, or the 
+    benchmark schema otherwise. Returns the seconds spent.
+    """
+    start = time.perf_counter()
+    if settings.VECTOR_STORE == "memory":
+        write_snapshot(
+            directory, corpus.ids, corpus.embeddings,
+            datetime.datetime.now(datetime.timezone.utc),
+            utils.get_embedding_model().name, dtype, lists)
+        store = MemoryVectorStore(directory)
+    else:
+        store = PostgresVectorStore()
+    # Replaces the store of the configured snapshot, which holds another 
+    # corpus
+    utils._vector_store = store
+    return {"snapshot_seconds": time.perf_counter() - start}
+
+
+def operations(
+    engine: Engine, collection, corpus: Corpus, rng: np.random.Generator
+) -> dict[str, Callable[[int], object]]:
+    """
+    Returns the benchmarked operations, each called with the iteration
+    number. Queries are unique per iteration to miss the embedding cache.
+    """
+    model = utils.get_embedding_model()
+
+    def random_id():
+        return corpus.ids[rng.integers(len(corpus))]
+
+    def query(i: int) -> dict:
+        return {"domain": f"{random_text(rng, 4)} {i}", "problem": random_text(rng, 12)}
+
+    def paper(i: int) -> dict:
+        return {"title": f"{random_text(rng, 6)} {i}", "abstract": random_text(rng, 150)}
+
+    def with_session(fn):
+        def run(i: int):
+            with Session(engine) as session:
+                return fn(session, i)
+        return run
+
+    return {
+        "encode": lambda i: model.encode(paper(i)),
+        "encode_batch_32": lambda i: model.encode_batch(
+            [paper(i * 32 + j) for j in range(32)]),
+        "search": with_session(lambda session, i: get_papers_by_similarity(
+            session, query(i), num_retrieval=5)),
+        "references": with_session(lambda session, i: get_references_by_id(
+            session, random_id())),
+        "graph_similar": with_session(lambda session, i: get_similar_references(
+            session, random_id(), model.encode_query(query(i)), num_retrieval=10)),
+        "graph_expand": with_session(lambda session, i: expand_references(
+            session, random_id(), model.encode_query(query(i)),
+            depth=2, beam_width=10)),
+        "metadata_summaries": lambda i: get_metadata_summaries_by_ids(
+            collection, [random_id() for _ in range(5)]),
+        "create_paper": with_session(lambda session, i: create_paper(
+            session, paper(i))),
+    }
+
+
+def measure(fn: Callable[[int], object], iterations: int, warmup: int) -> dict:
+    for i in range(warmup):
+        fn(-i - 1)
+
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+
+    ms = np.array(latencies) * 1000
+    return {
+        "iterations": iterations,
+        "throughput": iterations / sum(latencies),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mean-degree", type=float, default=10.0)
+    parser.add_argument(
+        "--degree-distribution", choices=["fixed", "poisson", "zipf"],
+        default="poisson")
+    parser.add_argument(
+        "--operations", nargs="+", help="run only these operations")
+    parser.add_argument(
+        "--real-model", action="store_true",
+        help="embed with the configured EMBEDDING_MODEL")
+    parser.add_argument(
+        "--snapshot-dtype", choices=["float32", "float16"], default="float16",
+        help="snapshot dtype with VECTOR_STORE=memory")
+    parser.add_argument(
+        "--snapshot-lists", type=int, default=0,
+        help="snapshot IVF lists with VECTOR_STORE=memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=pathlib.Path)
+    args = parser.parse_args()
+
+    if not args.real_model:
+        settings.EMBEDDING_MODEL = FakeEmbedding()
+    settings.EMBEDDING_MAX_BATCH_SIZE = 1
+    # Per-process version, so created papers invalidate nothing else
+    utils.response_cache = ResponseCache(MemoryCacheBackend(0))
+
+    engine = create_benchmark_engine()
+    collection = client.get_database(
+        settings.MONGO_DATABASE).get_collection(SCHEMA)
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    results = {
+        "started_at": started_at.isoformat(),
+        "commit": git_commit(),
+        "model": utils.get_embedding_model().name,
+        "settings": {
+            name: getattr(settings, name)
+        for name in (
+            "VECTOR_INDEX_TYPE", "VECTOR_SEARCH_MODE", "VECTOR_STORE",
+            "HNSW_M", "HNSW_EF_CONSTRUCTION", "HNSW_EF_SEARCH",
+            "IVFFLAT_LISTS", "IVFFLAT_PROBES")},
+        "snapshot": {
+            "dtype": args.snapshot_dtype,
+            "lists": args.snapshot_lists,
+        },
+        "corpus": {
+            "mean_degree": args.mean_degree,
+            "degree_distribution": args.degree_distribution,
+            "seed": args.seed,
+        },
+        "runs": [],
+    }
+
+    for size in args.sizes:
+        corpus = generate_corpus(
+            size, args.mean_degree, args.degree_distribution, args.seed)
+        run = {"size": size, "edges": len(corpus.edges)}
+        run |= load_corpus(engine, collection, corpus)
+        with tempfile.TemporaryDirectory() as directory:
+            run |= load_vector_store(
+                corpus, f"{directory}/vectors", args.snapshot_dtype,
+                args.snapshot_lists)
+            print(f"size {size}: loaded in {run['load_seconds']:.1f}s, "
+                  f"indexed in {run['index_seconds']:.1f}s")
+
+            rng = np.random.default_rng(args.seed)
+            run["operations"] = {}
+            for name, fn in operations(engine, collection, corpus, rng).items():
+                if args.operations and name not in args.operations:
+                    continue
+                stats = measure(fn, args.iterations, args.warmup)
+                run["operations"][name] = stats
+                print(f"  {name:<20} {stats['throughput']:>9.1f}/s  "
+                      f"p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  "
+                      f"p99 {stats['p99_ms']:>8.2f}ms")
+        results["runs"].append(run)
+
+    output = args.output or pathlib.Path(
+        "benchmarks/results", started_at.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import torch
+
+from app.core.batching import *
+
+
+def fake_encode_batch(texts: list[dict]) -> torch.Tensor:
+    return torch.tensor([[float(len(t['title'])), 1.0] for t in texts])
+
+
+def test_micro_batcher_returns_own_row():
+    batcher = MicroBatcher(fake_encode_batch, max_batch_size=8, max_wait_ms=20)
+    titles = ['a' * i for i in range(1, 17)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(
+            lambda t: batcher.submit({'title': t}), titles))
+
+    for title, emb in zip(titles, results):
+        assert emb[0].item() == len(title)
+
+    stats = batcher.stats.to_dict()
+    assert stats['requests'] == 16
+    assert stats['batches'] < 16
+    assert max(stats['batch_sizes']) <= 8
+
+
+def test_micro_batcher_propagates_errors():
+    def failing(texts):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(failing, max_batch_size=4, max_wait_ms=1)
+
+    with pytest.raises(ValueError, match="boom"):
+        batcher.submit({'title': 'x'})
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from app.core.cache import *
+from app.core.database import engine
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.stats()['misses'] == 1
+
+
+class FakeRedis:
+    """
+    Stand-in for the `redis.Redis` commands used by `RedisCacheBackend`
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+
+@pytest.mark.parametrize("backend", [
+    MemoryCacheBackend(maxsize=8),
+    MemoryCacheBackend(maxsize=8, engine=engine),
+    RedisCacheBackend(FakeRedis()),
+])
+def test_response_cache_versions(backend):
+    cache = ResponseCache(backend)
+    key = cache.key('query', {'domain': 'nlp', 'probes': 1})
+    cache.set(key, b'[{"id":"a"}]')
+
+    # Key order does not matter
+    assert cache.key('query', {'probes': 1, 'domain': 'nlp'}) == key
+    assert cache.get(key) == b'[{"id":"a"}]'
+
+    cache.bump_version()
+    new_key = cache.key('query', {'domain': 'nlp', 'probes': 1})
+    assert new_key != key
+    assert cache.get(new_key) is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_response_cache_shares_version_through_postgres():
+    # Caches of two processes, one of which writes
+    reader = ResponseCache(MemoryCacheBackend(maxsize=8, engine=engine))
+    writer = ResponseCache(MemoryCacheBackend(maxsize=8, engine=engine))
+    key = reader.key('query', {'domain': 'nlp'})
+    reader.set(key, b'[]')
+
+    writer.bump_version()
+
+    assert reader.key('query', {'domain': 'nlp'}) != key
+
+
+def test_response_cache_treats_backend_errors_as_misses():
+    class BrokenRedis(FakeRedis):
+        def get(self, key):
+            raise ConnectionError
+
+    cache = ResponseCache(RedisCacheBackend(BrokenRedis()))
+    key = cache.key('query', {'domain': 'nlp'})
+
+    assert key is None
+    assert cache.get(key) is None
+    cache.set(key, b'[]')
@@ -0,0 +1,94 @@
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.graph import CitationGraph, pagerank
+from app.crud.paper import create_paper, create_references
+
+
+@pytest.fixture(name="papers")
+def papers_fixture() -> list[uuid.UUID]:
+    return sorted(uuid.uuid4() for _ in range(6))
+
+
+def build_graph(papers: list[uuid.UUID], edges: list[tuple[int, int]]) -> CitationGraph:
+    ids = np.array([id.bytes for id in papers], dtype="S16")
+    edges = np.array(edges, dtype=np.int32).reshape(-1, 2)
+    return CitationGraph(ids, edges[:, 0], edges[:, 1])
+
+
+def test_shortest_path(papers):
+    # 0 -> 1 -> 2 -> 3 and 0 -> 4 <- 3; 5 is isolated
+    graph = build_graph(papers, [(0, 1), (1, 2), (2, 3), (0, 4), (3, 4)])
+
+    assert graph.shortest_path(papers[0], papers[3], 6) == [
+        papers[0], papers[4], papers[3]]
+    assert graph.shortest_path(papers[0], papers[3], 6, directed=True) == [
+        papers[0], papers[1], papers[2], papers[3]]
+    assert graph.shortest_path(papers[0], papers[3], 2, directed=True) is None
+    assert graph.shortest_path(papers[3], papers[0], 6, directed=True) is None
+    assert graph.shortest_path(papers[0], papers[5], 6) is None
+    assert graph.shortest_path(papers[0], uuid.uuid4(), 6) is None
+    assert graph.shortest_path(papers[2], papers[2], 6) == [papers[2]]
+    assert graph.cites(papers[3], papers[4])
+    assert not graph.cites(papers[4], papers[3])
+
+
+def test_add(papers):
+    graph = build_graph(papers, [(0, 1)])
+    new = uuid.uuid4()
+
+    graph.add([(papers[1], new), (new, papers[5]), (papers[0], papers[1])])
+
+    assert len(graph) == 7
+    assert graph.shortest_path(papers[0], papers[5], 6, directed=True) == [
+        papers[0], papers[1], new, papers[5]]
+    assert graph.shortest_path(papers[5], papers[0], 6) == [
+        papers[5], new, papers[1], papers[0]]
+    assert graph.cites(new, papers[5])
+
+
+def test_pagerank(papers):
+    graph = build_graph(papers, [(0, 1), (1, 2), (2, 0), (2, 1), (3, 1)])
+    transition = graph.transition_matrix().toarray()
+
+    ranks, iterations = pagerank(graph.transition_matrix(), tolerance=1e-9)
+
+    # Dense power iteration, walks at papers citing nothing jumping anywhere
+    n, expected = len(papers), np.full(len(papers), 1 / len(papers))
+    dangling = transition.sum(axis=1) == 0
+    for _ in range(200):
+        expected = (0.85 * transition.T @ expected
+                    + (0.85 * expected[dangling].sum() + 0.15) / n)
+    assert ranks == pytest.approx(expected * n, rel=1e-4)
+    assert ranks.mean() == pytest.approx(1.0)
+    assert iterations < 100
+
+
+def test_personalized_pagerank(papers):
+    # 0 -> 1 -> 2 and 3 -> 4; walks from 0 never reach 3 or 4
+    graph = build_graph(papers, [(0, 1), (1, 2), (3, 4)])
+
+    result = graph.personalized_pagerank({papers[0]: 1.0}, 5)
+
+    assert [id for id, _ in result] == [papers[1], papers[2]]
+    assert result[0][1] == pytest.approx(0.15 * 0.85)
+    assert graph.personalized_pagerank({uuid.uuid4(): 1.0}, 5) == []
+
+
+def test_load():
+    with Session(engine) as session:
+        a, b, c = (
+            create_paper(session, {'title': str(uuid.uuid4())}, dummy=True).id
+        for _ in range(3))
+        create_references(session, [(a, b), (c, b)])
+        session.commit()
+
+    with Session(engine) as session:
+        graph = CitationGraph.load(session)
+
+    assert graph.shortest_path(a, c, 2) == [a, b, c]
+    assert graph.cites(c, b)
@@ -0,0 +1,40 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import *
+
+
+def test_timed_counts_nested_stage_once():
+    @timed("nested")
+    def inner():
+        pass
+
+    @timed("nested")
+    def outer():
+        inner()
+
+    outer()
+
+    counts = {
+        s.labels["operation"]: s.value
+    for s in STAGE_SECONDS.collect()[0].samples
+    if s.name.endswith("_count") and s.labels["stage"] == "nested"}
+    assert counts == {"outer": 1.0}
+
+
+def test_server_timing_middleware():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    # Sync endpoints run in a threadpool with a copy of the context
+    @app.get("/")
+    @timed("endpoint")
+    def endpoint():
+        return {}
+
+    response = TestClient(app).get("/")
+
+    stages = [
+        entry.split(";")[0]
+    for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["endpoint", "total"]
@@ -0,0 +1,43 @@
+import asyncio
+import uuid
+
+from sqlalchemy import func, select
+
+from app.core.database import engine
+from app.core.notifications import NotificationListener
+
+
+def notify(channel: str, payload: str) -> None:
+    with engine.connect() as conn:
+        conn.execute(select(func.pg_notify(channel, payload)))
+        conn.commit()
+
+
+def test_listener_fans_out():
+    channel = f"test_{uuid.uuid4().hex}"
+
+    async def receive() -> tuple[list, list]:
+        listener = NotificationListener(channel, maxsize=2)
+        await listener.start()
+        fast = listener.subscribe(timeout=0.1)
+        slow = listener.subscribe(timeout=0.1)
+        # Subscribed once the first timeout passes
+        assert await anext(fast) is None
+        assert await anext(slow) is None
+
+        received = []
+        for payload in "abc":
+            notify(channel, payload)
+            while (payload := await anext(fast)) is None:
+                pass
+            received.append(payload)
+        # The slow subscriber fell behind and its stream ends
+        dropped = [payload async for payload in slow]
+
+        await fast.aclose()
+        await listener.stop()
+        return received, dropped
+
+    received, dropped = asyncio.run(receive())
+    assert received == ["a", "b", "c"]
+    assert dropped == ["b"]
@@ -0,0 +1,116 @@
+import datetime
+import uuid
+
+import numpy as np
+import pytest
+import torch
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.vector_store import MemoryVectorStore
+from app.crud.paper import create_paper
+from app.models.schemas import PaperFilter
+from app.scripts.build_vector_snapshot import write_snapshot
+
+
+@pytest.fixture(name="corpus")
+def corpus_fixture() -> tuple[list[uuid.UUID], np.ndarray]:
+    rng = np.random.default_rng(0)
+    ids = [uuid.uuid4() for _ in range(200)]
+    return ids, rng.standard_normal((200, 768)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype,lists", [
+    ("float32", 0), ("float16", 0), ("float32", 8)])
+def test_memory_vector_store_search(tmp_path, corpus, dtype, lists):
+    ids, embeddings = corpus
+    write_snapshot(
+        str(tmp_path / "snapshot"), ids, embeddings,
+        datetime.datetime.now(datetime.timezone.utc),
+        settings.EMBEDDING_MODEL.name, dtype, lists)
+    store = MemoryVectorStore(str(tmp_path / "snapshot"))
+
+    # Probing every list makes the IVF search exact
+    result = store.search(None, torch.from_numpy(embeddings[7]), 5, probes=8)
+
+    assert len(store) == 200
+    assert len(result) == 5
+    assert result[0][0] == ids[7]
+    assert result[0][1] == pytest.approx(1.0, abs=1e-3)
+    assert [score for _, score in result] == sorted(
+        [score for _, score in result], reverse=True)
+
+
+def test_memory_vector_store_add(tmp_path, corpus):
+    ids, embeddings = corpus
+    write_snapshot(
+        str(tmp_path / "snapshot"), ids, embeddings, None,
+        settings.EMBEDDING_MODEL.name)
+    store = MemoryVectorStore(str(tmp_path / "snapshot"))
+
+    # Replacing a snapshot row hides the old embedding
+    new_id, new = uuid.uuid4(), -embeddings[7]
+    store.add([ids[7], new_id], torch.from_numpy(np.stack([new, new])))
+
+    result = store.search(None, torch.from_numpy(new), 3)
+    assert {id for id, _ in result[:2]} == {ids[7], new_id}
+    result = store.search(None, torch.from_numpy(embeddings[7]), 200)
+    assert ids[7] not in [id for id, _ in result[:100]]
+    assert len(store) == 201
+
+
+def test_memory_vector_store_add_grows(corpus):
+    ids, embeddings = corpus
+    store = MemoryVectorStore()
+
+    # Adding the same papers again replaces their rows, and replaced rows 
+    # are compacted away once they outnumber live ones
+    for i in range(0, 200, 10):
+        store.add(ids[i:i + 10], torch.from_numpy(embeddings[i:i + 10]))
+    store.add(ids[:150], torch.from_numpy(embeddings[:150]))
+    store.add(ids[:150], torch.from_numpy(-embeddings[:150]))
+
+    assert len(store) == 200
+    assert store._count == 200
+    result = store.search(None, torch.from_numpy(-embeddings[7]), 1)
+    assert result[0][0] == ids[7]
+    assert result[0][1] == pytest.approx(1.0, abs=1e-3)
+    assert ids[7] not in [
+        id for id, _ in store.search(None, torch.from_numpy(embeddings[7]), 100)]
+
+
+def test_memory_vector_store_requires_snapshot(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MemoryVectorStore(str(tmp_path / "missing"))
+
+
+def test_memory_vector_store_sync():
+    store = MemoryVectorStore()
+    with Session(engine) as session:
+        paper = create_paper(session, {'title': f'synced {uuid.uuid4()}'})
+        store.sync(session)
+
+        query_emb = torch.tensor(paper.embedding)
+        assert store.search(session, query_emb, 1)[0][0] == paper.id
+        assert store.watermark >= paper.updated_at
+
+        # Rows read again in the overlap window are not added again
+        added = store._count
+        store.sync(session)
+        assert store._count == added
+
+
+def test_memory_vector_store_filtered_search():
+    store = MemoryVectorStore()
+    with Session(engine) as session:
+        paper = create_paper(session, {'title': f'filtered {uuid.uuid4()}'})
+        author = f'author-{uuid.uuid4()}'
+        paper.authors = [author]
+        session.commit()
+
+        # Not in the store, so found by the PostgreSQL fallback
+        query_emb = torch.tensor(paper.embedding)
+        result = store.search(
+            session, query_emb, 5, filters=PaperFilter(authors=[author]))
+        assert [id for id, _ in result] == [paper.id]
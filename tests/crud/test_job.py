@@ -0,0 +1,112 @@
+import uuid
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.crud.job import *
+from app.models.job import IngestJob
+from app.models.status import UploadStatus
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    # Park jobs left over from other tests so claims only see this test's
+    with Session(engine, expire_on_commit=False) as session:
+        session.execute(update(IngestJob)
+                        .where(IngestJob.status.in_(("pending", "running")))
+                        .values(status="failed"))
+        session.commit()
+        yield session
+
+
+def make_metadata(title: str) -> Metadata:
+    return Metadata(
+        title=title,
+        abstract=f'abstract of {title}',
+        body=[],
+        impact=1,
+        published_year='2024',
+        reference=[],
+        figures=[],
+        tables=[],
+        authors=['Jane'],
+    )
+
+
+def test_create_ingest_job(session: Session):
+    title = f'queued {uuid.uuid4()}'
+    job = create_ingest_job(session, make_metadata(title))
+
+    assert job.status == "pending"
+    assert job.payload['title'] == title
+    assert session.get(UploadStatus, job.request_id).filename == title
+
+
+def test_claim_and_complete_ingest_jobs(session: Session):
+    j1 = create_ingest_job(session, make_metadata(f'a {uuid.uuid4()}'))
+    j2 = create_ingest_job(session, make_metadata(f'b {uuid.uuid4()}'))
+
+    jobs = claim_ingest_jobs(session, limit=10, lease=60)
+    assert [job.id for job in jobs] == [j1.id, j2.id]
+    assert all(job.status == "running" and job.attempts == 1 for job in jobs)
+
+    # Leased jobs are not handed out twice
+    assert claim_ingest_jobs(session, limit=10, lease=60) == []
+
+    complete_ingest_jobs(session, jobs)
+    session.expire_all()
+    assert get_ingest_job(session, j1.id).status == "done"
+    assert session.get(UploadStatus, j1.request_id).db_loaded == True
+
+
+def test_fail_ingest_job(session: Session):
+    job = create_ingest_job(session, make_metadata(f'bad {uuid.uuid4()}'))
+
+    for attempt in range(settings.INGEST_MAX_ATTEMPTS):
+        # Make the scheduled retry due immediately
+        session.execute(update(IngestJob)
+                        .where(IngestJob.id == job.id)
+                        .values(run_at=func.now()))
+        session.commit()
+        [job] = claim_ingest_jobs(session, limit=1, lease=60)
+        fail_ingest_job(session, job, "boom")
+
+        session.expire_all()
+        job = get_ingest_job(session, job.id)
+        assert job.attempts == attempt + 1
+        assert job.last_error == "boom"
+
+    assert job.status == "failed"
+    assert claim_ingest_jobs(session, limit=1, lease=60) == []
+
+
+def test_expired_leases(session: Session):
+    job = create_ingest_job(session, make_metadata(f'slow {uuid.uuid4()}'))
+    [stale] = claim_ingest_jobs(session, limit=1, lease=60)
+
+    # The lease expires and another worker claims the job again
+    session.execute(update(IngestJob)
+                    .where(IngestJob.id == job.id)
+                    .values(run_at=func.now())
+                    .execution_options(synchronize_session=False))
+    session.commit()
+    with Session(engine) as other:
+        assert len(claim_ingest_jobs(other, limit=1, lease=60)) == 1
+
+    # The first worker finishing late does not complete the new claim
+    complete_ingest_jobs(session, [stale])
+    session.expire_all()
+    assert get_ingest_job(session, job.id).status == "running"
+
+    # Expired leases of jobs out of attempts fail them instead
+    session.execute(update(IngestJob)
+                    .where(IngestJob.id == job.id)
+                    .values(run_at=func.now(),
+                            attempts=settings.INGEST_MAX_ATTEMPTS))
+    session.commit()
+    assert claim_ingest_jobs(session, limit=1, lease=60) == []
+    session.expire_all()
+    assert get_ingest_job(session, job.id).status == "failed"
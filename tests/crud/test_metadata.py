@@ -50,3 +50,31 @@ def test_get_metadata_by_id(collection):
     result = get_metadata_by_id(collection, id)
     
     assert title == result.title
+
+
+def test_get_metadata_by_ids(collection):
+    missing_id = uuid.uuid4()
+    result = get_metadata_by_ids(collection, [missing_id, id])
+
+    assert list(result) == [id]
+    assert result[id].title == title
+
+
+def test_get_metadata_summaries_by_ids(collection):
+    result = get_metadata_summaries_by_ids(collection, [id])
+
+    assert result[id].title == title
+    assert result[id].authors == ['John', 'Doe']
+    assert not hasattr(result[id], 'body')
+
+
+def test_create_metadata_with_content_collection(collection):
+    content_collection = collection.database.get_collection('test-content')
+    paper_id = uuid.uuid4()
+    data = get_metadata_by_id(collection, id)
+
+    create_metadata(collection, paper_id, data, content_collection)
+
+    assert 'body' not in collection.find_one({'_id': paper_id})
+    result = get_metadata_by_id(collection, paper_id, content_collection)
+    assert result == data
@@ -30,6 +30,48 @@ def test_create_paper(session: Session):
     assert dummy_paper.embedding is None
 
 
+def test_create_paper_upgrades_dummy(session: Session):
+    title = f'title-{uuid.uuid4()}'
+    dummy = create_paper(session, {'title': title.upper()}, dummy=True)
+    again = create_paper(session, {'title': title}, dummy=True)
+    paper = create_paper(session, {'title': title, 'abstract': 'foo bar'})
+
+    assert again.id == dummy.id
+    assert paper.id == dummy.id
+    assert paper.title == title
+    assert paper.embedding is not None
+
+
+def test_resolve_reference_titles(session: Session):
+    known = create_paper(session, {'title': f'known {uuid.uuid4()}'})
+    unknown = f'unknown {uuid.uuid4()}'
+
+    result = resolve_reference_titles(
+        session, [known.title, unknown, f'  {unknown.upper()} '])
+    session.commit()
+
+    assert len(result) == 2
+    assert result[known.normalized_title] == known.id
+    dummy = get_paper_by_id(session, result[utils.normalize_text(unknown)])
+    assert dummy.embedding is None
+
+    # Resolving again finds the placeholder instead of adding another
+    assert resolve_reference_titles(session, [unknown]) == {
+        utils.normalize_text(unknown): dummy.id}
+
+
+def test_titles_without_normalized_form(session: Session):
+    # Non-Latin titles all normalize to "" and must not overwrite each other
+    titles = ['注意力机制', 'Трансформер', '???']
+    ids = upsert_papers(session, [{'title': t} for t in titles])
+    session.commit()
+
+    assert len(set(ids.values())) == 3
+    assert get_paper_by_id(session, ids[paper_title_key(titles[1])]).title == titles[1]
+    assert resolve_reference_titles(session, titles) == {}
+    assert create_paper(session, {'title': titles[2]}, dummy=True) is None
+
+
 def test_get_papers_by_similarity(session: Session):
     query = {
         'title': 'BERT', 
@@ -45,6 +87,58 @@ def test_get_papers_by_similarity(session: Session):
         assert type(elem) == Paper
 
 
+def test_get_papers_by_similarity_with_search_params(session: Session):
+    query = {
+        'domain': 'NLP',
+        'solution': 'Encoder-only transformer model'
+    }
+
+    result = get_papers_by_similarity(
+        session, query, num_retrieval=5, ef_search=100, probes=20)
+
+    assert type(result) == list
+    assert len(result) <= 5
+
+
+@pytest.mark.parametrize("mode", ["halfvec", "binary"])
+def test_get_papers_by_compact_embedding(
+    session: Session, monkeypatch: pytest.MonkeyPatch, mode: str
+):
+    paper = create_paper(session, {'title': f'compact {uuid.uuid4()}'})
+    monkeypatch.setattr(settings, "VECTOR_SEARCH_MODE", mode)
+
+    query_emb = torch.tensor(paper.embedding)
+    result = get_papers_by_embedding(session, query_emb, num_retrieval=3)
+
+    assert len(result) <= 3
+    # Re-ranking by the full embedding puts the exact match first
+    assert result[0].id == paper.id
+
+
+@pytest.mark.parametrize("prefilter_threshold", [0, 10000])
+def test_get_papers_by_embedding_with_filters(
+    session: Session, monkeypatch: pytest.MonkeyPatch, prefilter_threshold: int
+):
+    monkeypatch.setattr(
+        settings, "VECTOR_PREFILTER_THRESHOLD", prefilter_threshold)
+    author = f'author-{uuid.uuid4()}'
+    papers = [
+        create_paper(session, {'title': f'filtered {uuid.uuid4()}'})
+    for _ in range(3)]
+    for paper, year in zip(papers, [2018, 2020, 2022]):
+        paper.published_year = year
+        paper.impact = year - 2000
+        paper.authors = [author]
+    session.commit()
+
+    query_emb = torch.tensor(papers[0].embedding)
+    filters = PaperFilter(year_from=2019, min_impact=21, authors=[author])
+    result = get_papers_by_embedding(
+        session, query_emb, num_retrieval=5, filters=filters)
+
+    assert [p.id for p in result] == [papers[2].id]
+
+
 def test_get_paper_by_id(session: Session):
     texts = {
         'title': 'BERT', 
@@ -58,11 +152,9 @@ def test_get_paper_by_id(session: Session):
 
 
 def test_get_references_by_id(session: Session):
-    p1 = create_paper(session, {'title': 'paper 1'})
-    p2 = create_paper(session, {'title': 'paper 2'})
-    p3 = create_paper(session, {'title': 'paper 3'})
-    p4 = create_paper(session, {'title': 'paper 4'})
-    p5 = create_paper(session, {'title': 'paper 5'})
+    p1, p2, p3, p4, p5 = [
+        create_paper(session, {'title': f'paper {uuid.uuid4()}'})
+    for _ in range(5)]
 
     session.add_all([p1, p2, p3, p4, p5])
     p1.references.append(p2)
@@ -75,6 +167,87 @@ def test_get_references_by_id(session: Session):
     assert set(result) == {p1, p3, p4}
 
 
+def test_get_similar_references(session: Session):
+    p1, p2, p3 = [
+        create_paper(session, {'title': f'paper {uuid.uuid4()}'})
+    for _ in range(3)]
+    p4 = create_paper(session, {'title': f'paper {uuid.uuid4()}'}, dummy=True)
+
+    p1.references.append(p2)
+    p2.references.append(p3)
+    p2.references.append(p4)
+    session.commit()
+
+    query_emb = utils.create_query_embedding({'domain': 'paper'})
+    result = get_similar_references(session, p2.id, query_emb, 5)
+
+    assert {id for id, _ in result} == {p1.id, p3.id}
+    assert result[0][1] >= result[1][1]
+
+    result = get_similar_references(session, p2.id, query_emb, 1)
+    assert len(result) == 1
+
+
+def test_get_similar_references_by_centrality(session: Session):
+    p1, p2, p3 = [
+        create_paper(session, {'title': f'paper {uuid.uuid4()}'})
+    for _ in range(3)]
+    p2.references.append(p1)
+    p2.references.append(p3)
+    session.commit()
+    update_centrality(session, [p1.id, p3.id], [0.5, 20.0], [1, 1])
+    session.commit()
+
+    query_emb = utils.create_query_embedding({'domain': 'paper'})
+    result = get_similar_references(
+        session, p2.id, query_emb, 2, centrality_weight=1.0)
+
+    assert [id for id, _ in result] == [p3.id, p1.id]
+    assert result[0][1] == pytest.approx(20 / 21)
+
+
+def test_expand_references(session: Session):
+    p1, p2, p3, p4, p5 = [
+        create_paper(session, {'title': f'hop {uuid.uuid4()}'})
+    for _ in range(5)]
+
+    p1.references.append(p2)
+    p1.references.append(p3)
+    p4.references.append(p2)
+    p4.references.append(p5)
+    session.commit()
+
+    query_emb = utils.create_query_embedding({'domain': 'hop'})
+    result = expand_references(session, p1.id, query_emb, 3, 2)
+    nodes = {id: (parent_id, depth) for id, parent_id, depth, _ in result}
+
+    assert nodes[p2.id] == (p1.id, 1)
+    assert nodes[p3.id] == (p1.id, 1)
+    assert nodes[p4.id] == (p2.id, 2)
+    assert nodes[p5.id] == (p4.id, 3)
+    assert p1.id not in nodes
+
+
+def test_expand_references_dedupes_levels(session: Session):
+    root, a, b, c, d = [
+        create_paper(session, {'title': f'level {uuid.uuid4()}'})
+    for _ in range(5)]
+
+    # a and b cite each other, so each is also reached at depth 2
+    root.references.extend([a, b])
+    a.references.extend([b, c])
+    b.references.extend([a, d])
+    session.commit()
+
+    query_emb = utils.create_query_embedding({'domain': 'level'})
+    result = expand_references(session, root.id, query_emb, 2, 2)
+
+    assert {id: depth for id, _, depth, _ in result} == {
+        a.id: 1, b.id: 1, c.id: 2, d.id: 2}
+    assert [row[2] for row in expand_references(
+        session, root.id, query_emb, 2, 2, num_nodes=3)] == [1, 1, 2]
+
+
 def test_update_paper(session: Session):
     title = f'title-{str(uuid.uuid4())}'
     p1 = create_paper(session, {'title': title}, dummy=True)
@@ -87,4 +260,38 @@ def test_update_paper(session: Session):
 
     assert p1.id == p.id
     assert p.embedding is not None
-    
\ No newline at end of file
+    
+
+def test_update_embeddings(session: Session):
+    p1 = create_paper(session, {'title': f'title-{uuid.uuid4()}'})
+    p2 = create_paper(session, {'title': f'title-{uuid.uuid4()}'})
+
+    embeddings = torch.rand(2, 768)
+    update_embeddings(session, [p1.id, p2.id], embeddings, 'new-model')
+    session.commit()
+    session.refresh(p1)
+    session.refresh(p2)
+
+    assert p1.embedding_model == 'new-model'
+    assert p2.embedding_model == 'new-model'
+    assert p1.embedding == pytest.approx(embeddings[0].tolist(), abs=1e-6)
+    assert p2.embedding == pytest.approx(embeddings[1].tolist(), abs=1e-6)
+
+
+def test_update_centrality(session: Session):
+    p1 = create_paper(session, {'title': f'title-{uuid.uuid4()}'}, dummy=True)
+    updated_at = p1.updated_at
+
+    update_centrality(session, [p1.id], [2.5], [3])
+    session.commit()
+    session.refresh(p1)
+
+    assert p1.pagerank == 2.5
+    assert p1.in_degree == 3
+    assert p1.updated_at == updated_at
+
+
+def test_blend_centrality():
+    assert blend_centrality(0.8, None, 0.0) == 0.8
+    assert blend_centrality(0.8, None, 0.5) == pytest.approx(0.4)
+    assert blend_centrality(0.8, 1.0, 0.5) == pytest.approx(0.65)
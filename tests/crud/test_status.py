@@ -1,3 +1,5 @@
+import asyncio
+import json
 import uuid
 
 import pytest
@@ -5,7 +7,9 @@ from sqlalchemy.orm import Session
 from app.models.status import UploadStatus
 
 from app.core.database import engine
+from app.core.notifications import NotificationListener
 from app.crud.status import *
+from app.models.schemas import UploadStatusUpdate
 
 
 @pytest.fixture(name="session")
@@ -42,3 +46,88 @@ def test_update_upload_status(session: Session):
     assert s1.request_id == s1_new.request_id
     assert s1_new.pdf_upload == True
     assert s1_new.reading_order == True
+
+
+def test_get_upload_status_page(session: Session):
+    filename = str(uuid.uuid4())
+    statuses = [create_upload_status(session, filename) for _ in range(3)]
+    statuses[1].db_loaded = True
+    update_upload_status(session, statuses[1])
+
+    page = get_upload_status_page(session, limit=2, filename=filename)
+    assert [s.request_id for s in page] == [s.request_id for s in statuses[:2]]
+    page = get_upload_status_page(
+        session, after=page[-1].request_id, limit=2, filename=filename)
+    assert [s.request_id for s in page] == [statuses[2].request_id]
+
+    page = get_upload_status_page(
+        session, incomplete='db_loaded', filename=filename)
+    assert statuses[1].request_id not in [s.request_id for s in page]
+
+
+def test_iter_upload_status(session: Session):
+    filename = str(uuid.uuid4())
+    statuses = [create_upload_status(session, filename) for _ in range(3)]
+
+    result = list(iter_upload_status(session, filename=filename, chunk_size=2))
+
+    assert [s.request_id for s in result] == [s.request_id for s in statuses]
+
+
+def test_update_upload_status_many(session: Session):
+    s1 = create_upload_status(session, str(uuid.uuid4()))
+    s2 = create_upload_status(session, str(uuid.uuid4()))
+    s2.pdf_upload = True
+    update_upload_status(session, s2)
+
+    updated = update_upload_status_many(session, [
+        UploadStatusUpdate(request_id=s2.request_id, document_layout=True),
+        UploadStatusUpdate(request_id=s1.request_id, pdf_upload=True),
+        UploadStatusUpdate(request_id=-1, db_loaded=True),
+    ])
+
+    assert [s.request_id for s in updated] == [s1.request_id, s2.request_id]
+    assert updated[0].pdf_upload and not updated[0].document_layout
+    assert updated[1].pdf_upload and updated[1].document_layout
+    session.expire_all()
+    assert session.get(UploadStatus, s2.request_id).document_layout == True
+
+    # Updates of the same upload in one batch all apply
+    [merged] = update_upload_status_many(session, [
+        UploadStatusUpdate(request_id=s1.request_id, document_layout=True),
+        UploadStatusUpdate(request_id=s1.request_id, reading_order=True),
+        UploadStatusUpdate(request_id=s1.request_id, document_layout=False),
+    ])
+    assert merged.pdf_upload and merged.document_layout and merged.reading_order
+
+
+def test_update_upload_status_notifies(session: Session):
+    status = create_upload_status(session, str(uuid.uuid4()))
+
+    async def receive() -> list[dict]:
+        listener = NotificationListener(UPLOAD_STATUS_CHANNEL, maxsize=10)
+        await listener.start()
+        events = listener.subscribe(timeout=0.1)
+        # Subscribed once the first timeout passes
+        assert await anext(events) is None
+        status.db_loaded = True
+        update_upload_status(session, status)
+        # Statements outside these functions notify too
+        session.execute(update(UploadStatus)
+                        .where(UploadStatus.request_id == status.request_id)
+                        .values(reading_order=True))
+        session.commit()
+        payloads = []
+        for _ in range(50):
+            payload = await anext(events)
+            if payload is not None:
+                payloads.append(json.loads(payload))
+            if len(payloads) == 2:
+                break
+        await events.aclose()
+        await listener.stop()
+        return payloads
+
+    loaded, read = asyncio.run(receive())
+    assert loaded == status.to_dict() | {'reading_order': False}
+    assert read == status.to_dict()
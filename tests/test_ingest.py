@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+import app.utils as utils
+from app.core.database import collection, engine
+from app.crud.metadata import get_metadata_by_ids
+from app.crud.paper import get_paper_by_id
+from app.ingest import *
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    with Session(engine) as session:
+        yield session
+
+
+def make_metadata(title: str, reference: list[str]) -> Metadata:
+    return Metadata(
+        title=title,
+        abstract=f'abstract of {title}',
+        body=[],
+        impact=1,
+        published_year='2024',
+        reference=reference,
+        figures=[],
+        tables=[],
+        authors=['Jane'],
+    )
+
+
+def test_ingest_papers(session: Session):
+    title = f'bulk {uuid.uuid4()}'
+    refs = [f'Ref A: {uuid.uuid4()}', f'Ref B: {uuid.uuid4()}']
+    documents = [
+        make_metadata(title, refs),
+        make_metadata(f'other {uuid.uuid4()}', []),
+    ]
+    embeddings = utils.create_embeddings(
+        [{'title': d.title, 'abstract': d.abstract} for d in documents], 2)
+
+    ids = ingest_papers(session, collection, documents, embeddings)
+
+    assert len(ids) == 2
+    paper = get_paper_by_id(session, ids[0])
+    assert paper.title == title
+    assert len(paper.embedding) == 768
+    assert sorted(ref.title for ref in paper.references) == refs
+    assert (paper.published_year, paper.impact, paper.authors) == (2024, 1, ['Jane'])
+    assert set(get_metadata_by_ids(collection, ids)) == set(ids)
+
+    # Re-ingesting updates the existing paper instead of adding one
+    assert ingest_papers(session, collection, documents[:1], embeddings[:1]) \
+        == ids[:1]
+
+
+def test_filter_columns():
+    assert filter_columns('2020-05-14', 3, ['Jane'])['published_year'] == 2020
+    assert filter_columns('unknown', None, None)['published_year'] is None
+    assert filter_columns(None, None, None)['published_year'] is None
@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 import torch
 
@@ -41,3 +43,70 @@ def test_normalize_text():
     text2 = "some random text"
 
     assert normalize_text(text1) == normalize_text(text2)
+
+
+def test_canonicalize_query():
+    query1 = {'domain': '  NLP ', 'problem': None, 'solution': 'Encoder\n only'}
+    query2 = {'domain': 'NLP', 'problem': ' ', 'solution': 'Encoder only'}
+
+    assert canonicalize_query(query1) == canonicalize_query(query2)
+    assert canonicalize_query({'domain': 'nlp'}) != canonicalize_query(query1)
+
+
+def test_create_query_embedding_cached():
+    query = {'domain': 'NLP', 'solution': 'Encoder-only transformer model'}
+    create_query_embedding(query)
+    hits = query_embedding_cache.hits
+
+    embedding = create_query_embedding({**query, 'domain': ' NLP', 'problem': ''})
+
+    assert query_embedding_cache.hits == hits + 1
+    assert len(embedding) == 768
+
+
+def test_create_query_embedding_same_key_same_embedding():
+    # Both share a cache key; each is encoded on a miss
+    domain = f'NLP {uuid.uuid4()}'
+    queries = [{'domain': domain, 'problem': ''}, {'domain': f' {domain}\n'}]
+
+    embeddings = []
+    for query in queries:
+        query_embedding_cache.clear()
+        embeddings.append(create_query_embedding(query))
+    hit = create_query_embedding(queries[0])
+
+    assert torch.allclose(embeddings[0], embeddings[1], atol=1e-5)
+    assert torch.equal(hit, embeddings[1])
+    expected = get_embedding_model().encode_query({'domain': domain})
+    assert torch.allclose(embeddings[0], expected, atol=1e-5)
+
+
+class HiddenStateEmbedding(Embedding):
+    """
+    Returns rows of a larger output, like a batched transformer does
+    """
+
+    name = "hidden-state"
+
+    def __init__(self):
+        pass
+
+    def encode(self, text: dict) -> torch.Tensor:
+        return torch.ones(16, 512, 768)[:, 0, :][0]
+
+    def encode_query(self, text: dict) -> torch.Tensor:
+        return self.encode(text)
+
+
+def test_create_query_embedding_owns_storage(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", HiddenStateEmbedding())
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_BATCH_SIZE", 1)
+
+    embedding = create_query_embedding({'domain': f'storage {uuid.uuid4()}'})
+
+    assert embedding.untyped_storage().nbytes() == embedding.nbytes
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [(0, 1), (2, 3), (4,)]
+    assert list(chunked([], 2)) == []
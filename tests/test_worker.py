@@ -0,0 +1,45 @@
+import uuid
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.crud.job import claim_ingest_jobs, create_ingest_job, get_ingest_job
+from app.crud.paper import get_paper_by_title
+from app.models.job import IngestJob
+from app.models.status import UploadStatus
+from app.worker import *
+from tests.crud.test_job import make_metadata
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    with Session(engine, expire_on_commit=False) as session:
+        session.execute(update(IngestJob)
+                        .where(IngestJob.status.in_(("pending", "running")))
+                        .values(status="failed"))
+        session.commit()
+        yield session
+
+
+def test_process_ingest_jobs(session: Session):
+    title = f'worker {uuid.uuid4()}'
+    good = create_ingest_job(session, make_metadata(title))
+    bad = create_ingest_job(session, make_metadata(f'bad {uuid.uuid4()}'))
+    session.execute(update(IngestJob)
+                    .where(IngestJob.id == bad.id)
+                    .values(payload={'title': 'missing fields'}))
+    session.commit()
+
+    jobs = claim_ingest_jobs(session, limit=10, lease=60)
+    process_ingest_jobs(session, jobs)
+
+    # The bad job fails alone and is scheduled for a retry
+    session.expire_all()
+    assert get_ingest_job(session, good.id).status == "done"
+    assert session.get(UploadStatus, good.request_id).db_loaded == True
+    assert get_paper_by_title(session, title).embedding is not None
+    bad = get_ingest_job(session, bad.id)
+    assert bad.status == "pending"
+    assert bad.last_error is not None